@@ -0,0 +1,122 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def body(response):
+    content = b''.join(response.streaming_content)
+    if response.get('Content-Encoding') == 'gzip':
+        content = gzip.decompress(content)
+    return json.loads(content)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Group', slug='group', description='Description'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Post {number}',
+            )
+            for number in range(7)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Comment'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def walk(self, client, url, **params):
+        """Follow the next cursors and return the ids of all pages."""
+        ids = []
+        while True:
+            data = body(client.get(url, params))
+            ids.extend(row['id'] for row in data['results'])
+            if not data['next']:
+                return ids
+            params['cursor'] = data['next']
+
+    def test_feeds_page_with_cursors(self):
+        newest = [post.pk for post in reversed(self.posts)]
+        cases = (
+            (self.client, reverse('api:index'), newest),
+            (
+                self.client,
+                reverse('api:group_list', args=(self.group.slug,)),
+                [pk for pk in newest if pk in {
+                    post.pk for post in self.posts if post.group_id
+                }],
+            ),
+            (
+                self.client,
+                reverse('api:profile', args=(self.author.username,)),
+                newest,
+            ),
+            (self.reader_client, reverse('api:follow_index'), newest),
+        )
+        for client, url, expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(client, url, limit=3), expected)
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            reverse('api:index'), {'fields': 'id,author', 'limit': 1}
+        )
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(body(response)['results'], [
+            {'id': self.posts[-1].pk, 'author': 'author'}
+        ])
+        response = self.client.get(reverse('api:index'), {'fields': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('api:index'), {'cursor': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail(self):
+        url = reverse('api:post_detail', args=(self.posts[0].pk,))
+        data = body(self.client.get(url, {'fields': 'text,comments'}))
+        self.assertEqual(data['text'], 'Post 0')
+        self.assertEqual(
+            [(c['author'], c['text']) for c in data['comments']],
+            [('reader', 'Comment')],
+        )
+        data = body(self.client.get(url, {'fields': 'comments'}))
+        self.assertEqual(len(data['comments']), 1)
+        response = self.client.get(
+            reverse('api:post_detail', args=(0,))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_requires_login(self):
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(NUM=100)
+    def test_gzip_and_conditional_get(self):
+        response = self.client.get(
+            reverse('api:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(body(response)['results']), 7)
+        response = self.client.get(
+            reverse('api:index'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
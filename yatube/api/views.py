@@ -0,0 +1,192 @@
+"""Read-only JSON API mirroring the post pages.
+
+Rows are read with ``.values()`` and paged with cursors only, so no
+model instances are built and no ``COUNT(*)`` is run. ``?fields=``
+selects the keys of every object, ``?limit=`` the page size. Bodies are
+compact JSON written piece by piece into a streaming, gzipped response.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.gzip import gzip_page
+
+from posts import caching
+from posts.models import Comment, Group, Post
+from posts.timeline import FEED_KEYS, timeline_posts
+from posts.utils import CursorPaginator
+from posts.views import (
+    group_scopes,
+    index_scopes,
+    post_scopes,
+    profile_scopes,
+)
+
+
+User = get_user_model()
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+
+COMMENT_FIELDS = ('id', 'author__username', 'text', 'pub_date')
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+
+
+def _error(error):
+    return JsonResponse({'detail': str(error)}, status=error.status)
+
+
+def _dumps(value):
+    return json.dumps(
+        value, cls=DjangoJSONEncoder, separators=(',', ':'),
+        ensure_ascii=False,
+    )
+
+
+def _fields(request, available):
+    names = request.GET.get('fields')
+    if not names:
+        return tuple(available)
+    names = tuple(dict.fromkeys(
+        name.strip() for name in names.split(',') if name.strip()
+    ))
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        raise ApiError(400, f'Unknown fields: {", ".join(unknown)}')
+    return names
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.NUM))
+    except ValueError:
+        raise ApiError(400, 'The limit is not an integer')
+    if not 1 <= limit <= settings.API_MAX_LIMIT:
+        raise ApiError(
+            400, f'The limit must be between 1 and {settings.API_MAX_LIMIT}'
+        )
+    return limit
+
+
+def _object(row, fields):
+    return _dumps({name: row[POST_FIELDS[name]] for name in fields})
+
+
+def _stream_page(page, fields):
+    yield '{"results":['
+    for index, row in enumerate(page.object_list):
+        yield (',' if index else '') + _object(row, fields)
+    yield (
+        f'],"next":{_dumps(page.next_cursor)}'
+        f',"previous":{_dumps(page.previous_cursor)}}}'
+    )
+
+
+def _feed(request, queryset, keys=None):
+    """Stream one cursor page of posts."""
+    try:
+        fields = _fields(request, POST_FIELDS)
+        paginator = CursorPaginator(
+            queryset, _limit(request), count=False, keys=keys
+        )
+        columns = {POST_FIELDS[name] for name in fields}
+        paginator.object_list = paginator.object_list.values(
+            *columns.union(paginator.keys)
+        )
+        cursor = request.GET.get('cursor')
+        try:
+            page = (
+                paginator.cursor_page(cursor) if cursor
+                else paginator.page(1)
+            )
+        except InvalidPage:
+            raise ApiError(400, 'Invalid cursor')
+    except ApiError as error:
+        return _error(error)
+    return StreamingHttpResponse(
+        _stream_page(page, fields), content_type='application/json'
+    )
+
+
+@gzip_page
+@caching.conditional_page(index_scopes)
+def index(request):
+    return _feed(request, Post.objects.all())
+
+
+@gzip_page
+@caching.conditional_page(group_scopes)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values_list('pk', flat=True)
+    if not group:
+        return _error(ApiError(404, 'Group not found'))
+    return _feed(request, Post.objects.filter(group=group[0]))
+
+
+@gzip_page
+@caching.conditional_page(profile_scopes)
+def profile(request, username):
+    author = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True)
+    if not author:
+        return _error(ApiError(404, 'User not found'))
+    return _feed(request, Post.objects.filter(author=author[0]))
+
+
+@gzip_page
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error(ApiError(401, 'Authentication required'))
+    return _feed(request, timeline_posts(request.user), keys=FEED_KEYS)
+
+
+def _stream_post(row, fields, comments):
+    post = _object(row, fields)
+    if comments is None:
+        yield post
+        return
+    yield post[:-1] + (',' if len(post) > 2 else '') + '"comments":['
+    for index, comment in enumerate(comments.iterator()):
+        comment['author'] = comment.pop('author__username')
+        yield (',' if index else '') + _dumps(comment)
+    yield ']}'
+
+
+@gzip_page
+@caching.conditional_page(post_scopes)
+def post_detail(request, post_id):
+    try:
+        fields = _fields(request, (*POST_FIELDS, 'comments'))
+    except ApiError as error:
+        return _error(error)
+    post_fields = [name for name in fields if name != 'comments']
+    row = Post.objects.filter(pk=post_id).values(
+        'id', *(POST_FIELDS[name] for name in post_fields)
+    ).first()
+    if row is None:
+        return _error(ApiError(404, 'Post not found'))
+    comments = None
+    if 'comments' in fields:
+        comments = Comment.objects.filter(
+            post_id=post_id
+        ).order_by('pub_date', 'id').values(*COMMENT_FIELDS)
+    return StreamingHttpResponse(
+        _stream_post(row, post_fields, comments),
+        content_type='application/json',
+    )
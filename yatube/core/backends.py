@@ -0,0 +1,130 @@
+"""Template and cache backends reporting to ``core.metrics``, and a file
+cache with atomic ``add`` and ``incr`` that culls outside of writes.
+"""
+import fcntl
+import os
+import pickle
+import random
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends import filebased, locmem
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+_MISSING = object()
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with metrics.timer('template_time'):
+            return super().render(context, request)
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self
+        )
+
+
+class CountingCacheMixin:
+    """Count the hits and misses of ``get`` and ``get_many``."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            metrics.add('cache_misses')
+            return default
+        metrics.add('cache_hits')
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with metrics.batch():
+            found = super().get_many(keys, version)
+        metrics.add('cache_hits', len(found))
+        metrics.add('cache_misses', len(keys) - len(found))
+        return found
+
+
+class LocMemCache(CountingCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class LockingFileBasedCache(filebased.FileBasedCache):
+    """``FileBasedCache`` whose ``add`` and ``incr`` are atomic across the
+    processes of a host: both hold an exclusive ``flock`` on a lock file
+    in the cache directory while they read and write.
+
+    Writes do not cull: listing the whole directory on every ``set`` and
+    ``incr`` costs more than the write itself. The ``cull_cache`` command
+    calls ``cull`` periodically instead.
+    """
+
+    LOCK_FILE = 'lock'
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def add(self, *args, **kwargs):
+        with self._locked():
+            return super().add(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with self._locked():
+            return super().incr(*args, **kwargs)
+
+    def _cull(self):
+        """Leave culling to ``cull``."""
+
+    def cull(self):
+        """Delete the expired entries and, while more than ``MAX_ENTRIES``
+        remain, a ``1 / CULL_FREQUENCY`` share of the others that expire.
+
+        Entries stored without a timeout, such as generation counters and
+        feed versions, are never culled: losing one serves stale pages.
+        Return the number of deleted entries.
+        """
+        now = time.time()
+        entries = self._list_cache_files()
+        expiring, deleted = [], 0
+        for fname in entries:
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+            except FileNotFoundError:
+                continue
+            except EOFError:
+                expiry = 0
+            if expiry is None:
+                continue
+            if expiry < now:
+                self._delete(fname)
+                deleted += 1
+            else:
+                expiring.append(fname)
+        remaining = len(entries) - deleted
+        if remaining >= self._max_entries:
+            if self._cull_frequency == 0:
+                victims = expiring
+            else:
+                victims = random.sample(expiring, min(
+                    len(expiring), remaining // self._cull_frequency
+                ))
+            for fname in victims:
+                self._delete(fname)
+            deleted += len(victims)
+        return deleted
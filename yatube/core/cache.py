@@ -0,0 +1,309 @@
+"""Two-tier cache: a per-process LRU in front of a shared cache.
+
+Every worker keeps the values it read recently in memory (L1) for at
+most ``L1_TIMEOUT`` seconds; all workers share the ``L2`` cache alias,
+a file-based cache by default or Redis when one is configured.
+
+Keys are spread over ``BUCKETS`` generation counters stored in L2. A
+write bumps the counter of its key's bucket and then one total counter.
+Each worker reads the total at the start of every request (and at least
+every ``L1_TIMEOUT`` seconds); only when it moved are all counters read,
+in one ``get_many``, to drop the L1 entries of buckets another worker
+wrote to. The L2 backend must make ``incr`` and ``add`` atomic, as
+Redis, memcached and ``core.backends.LockingFileBasedCache`` do, and
+must not evict the counters, which are stored without a timeout.
+
+Keys starting with one of the ``L2_ONLY`` prefixes, such as locks, go
+straight to L2: they are never kept in L1, so their writes bump nothing.
+"""
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import request_started
+
+from .backends import CountingCacheMixin
+
+
+GENERATION_KEY = 'tiered-generation:{}'
+
+TOTAL_KEY = 'tiered-generation'
+
+_MISSING = object()
+
+_stores = {}
+
+_stores_lock = threading.Lock()
+
+_requests = 0
+
+
+def _request_started(**kwargs):
+    global _requests
+    _requests += 1
+
+
+request_started.connect(_request_started)
+
+
+class L1Store:
+    """The LRU of one process, shared by its threads."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.total = None
+        self.checked_at = 0
+        self.checked_request = -1
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, bucket, pickled = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return pickled
+
+    def put(self, key, bucket, value, timeout):
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + timeout,
+                bucket,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def drop(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def drop_buckets(self, buckets):
+        with self.lock:
+            for key, (expires, bucket, pickled) in list(self.entries.items()):
+                if bucket in buckets:
+                    del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generations = {}
+            self.total = None
+
+
+class TwoTierCache(BaseCache):
+    """Cache backend combining an ``L1Store`` with the ``L2`` alias.
+
+    ``LOCATION`` names the L1 store, like it does for ``LocMemCache``.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.buckets = options.get('BUCKETS', 64)
+        self.l2_only = tuple(options.get('L2_ONLY', ()))
+        with _stores_lock:
+            self.store = _stores.setdefault(
+                location, L1Store(options.get('L1_MAX_ENTRIES', 1000))
+            )
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _is_l2_only(self, key):
+        return key.startswith(self.l2_only)
+
+    def _bucket(self, key):
+        return zlib.crc32(key.encode()) % self.buckets
+
+    def _l1_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def _refresh(self):
+        """Drop the L1 entries of buckets written by other workers."""
+        store = self.store
+        if (store.checked_request == _requests
+                and time.monotonic() - store.checked_at < self.l1_timeout):
+            return
+        total = self.l2.get(TOTAL_KEY, 0)
+        if total != store.total:
+            keys = [GENERATION_KEY.format(bucket) for bucket in range(
+                self.buckets
+            )]
+            current = self.l2.get_many(keys)
+            generations = {
+                bucket: current.get(key, 0)
+                for bucket, key in enumerate(keys)
+            }
+            changed = {
+                bucket for bucket, generation in generations.items()
+                if store.generations.get(bucket, 0) != generation
+            }
+            if changed:
+                store.drop_buckets(changed)
+            store.generations = generations
+            store.total = total
+        store.checked_at = time.monotonic()
+        store.checked_request = _requests
+
+    def _incr(self, key):
+        try:
+            return self.l2.incr(key)
+        except ValueError:
+            self.l2.add(key, 0, None)
+            return self.l2.incr(key)
+
+    def _bump(self, keys):
+        """Tell the other workers that these keys changed."""
+        for bucket in {self._bucket(key) for key in keys}:
+            generation = self._incr(GENERATION_KEY.format(bucket))
+            seen = self.store.generations.get(bucket, 0)
+            if generation != seen + 1:
+                # Someone else wrote to this bucket in between as well.
+                self.store.drop_buckets({bucket})
+            self.store.generations[bucket] = generation
+        total = self._incr(TOTAL_KEY)
+        if self.store.total is not None and total == self.store.total + 1:
+            self.store.total = total
+        else:
+            # Others wrote as well; read all counters on the next check.
+            self.store.total = None
+
+    def _local(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        if self._is_l2_only(key):
+            return self.l2.get(key, default, version)
+        local = self._local(key, version)
+        self._refresh()
+        pickled = self.store.get(local)
+        if pickled is not None:
+            return pickle.loads(pickled)
+        value = self.l2.get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        self.store.put(local, self._bucket(local), value, self.l1_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._refresh()
+        found, missing = {}, []
+        for key in keys:
+            if self._is_l2_only(key):
+                missing.append(key)
+                continue
+            pickled = self.store.get(self._local(key, version))
+            if pickled is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        if missing:
+            fetched = self.l2.get_many(missing, version)
+            for key, value in fetched.items():
+                if self._is_l2_only(key):
+                    continue
+                local = self._local(key, version)
+                self.store.put(
+                    local, self._bucket(local), value, self.l1_timeout
+                )
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._is_l2_only(key):
+            return self.l2.set(key, value, timeout, version)
+        local = self._local(key, version)
+        self.l2.set(key, value, timeout, version)
+        self._bump([local])
+        if timeout != 0:
+            self.store.put(
+                local, self._bucket(local), value, self._l1_timeout(timeout)
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._is_l2_only(key):
+            return self.l2.add(key, value, timeout, version)
+        local = self._local(key, version)
+        if not self.l2.add(key, value, timeout, version):
+            return False
+        self._bump([local])
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version)
+        keys = {
+            self._local(key, version): key
+            for key in data if not self._is_l2_only(key)
+        }
+        if keys:
+            self._bump(keys)
+        if timeout != 0:
+            for local, key in keys.items():
+                if key not in failed:
+                    self.store.put(
+                        local, self._bucket(local), data[key],
+                        self._l1_timeout(timeout),
+                    )
+        return failed
+
+    def delete(self, key, version=None):
+        if self._is_l2_only(key):
+            return self.l2.delete(key, version)
+        local = self._local(key, version)
+        self.l2.delete(key, version)
+        self.store.drop([local])
+        self._bump([local])
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version)
+        locals_ = [
+            self._local(key, version)
+            for key in keys if not self._is_l2_only(key)
+        ]
+        if locals_:
+            self.store.drop(locals_)
+            self._bump(locals_)
+
+    def incr(self, key, delta=1, version=None):
+        if self._is_l2_only(key):
+            return self.l2.incr(key, delta, version)
+        local = self._local(key, version)
+        value = self.l2.incr(key, delta, version)
+        self.store.drop([local])
+        self._bump([local])
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version) is not _MISSING
+
+    def clear(self):
+        self.l2.clear()
+        self.store.clear()
+
+
+class TieredCache(CountingCacheMixin, TwoTierCache):
+    pass
@@ -0,0 +1,92 @@
+"""SQLite tuning and read routing.
+
+Every new SQLite connection runs the ``SQLITE_PRAGMAS``: in WAL mode
+readers keep reading the last committed data while a post or comment is
+written, instead of waiting for the writer's lock. With ``DB_READ_REPLICA``
+set, GET and HEAD requests read through a second, read-only connection to
+the same file (see ``ReadReplicaRouter``), so a stray write from a page
+view fails loudly instead of taking the write lock.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+REPLICA = 'replica'
+
+_state = threading.local()
+
+
+def is_read_only(settings_dict):
+    return 'mode=ro' in str(settings_dict['NAME'])
+
+
+def apply_pragmas(cursor, pragmas, read_only=False):
+    """Run ``PRAGMA name = value`` for each pragma.
+
+    A read-only connection cannot change the journal mode, which is
+    stored in the database file anyway.
+    """
+    for name, value in pragmas.items():
+        if read_only and name == 'journal_mode':
+            continue
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or getattr(
+        connection, 'pool_reused', False
+    ):
+        return
+    # The raw cursor keeps the pragmas out of the request metrics.
+    cursor = connection.connection.cursor()
+    try:
+        apply_pragmas(
+            cursor,
+            settings.SQLITE_PRAGMAS,
+            is_read_only(connection.settings_dict),
+        )
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def read_only_reads():
+    """Let the router send the reads of this thread to the replica."""
+    previous = getattr(_state, 'read_only', False)
+    _state.read_only = True
+    try:
+        yield
+    finally:
+        _state.read_only = previous
+
+
+class ReadReplicaRouter:
+    """Send reads to the ``replica`` alias inside ``read_only_reads``.
+
+    Reads inside a transaction stay on the default connection, so they
+    see the transaction's own writes. Writes always go to the default
+    database, even for objects that were read from the replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (getattr(_state, 'read_only', False)
+                and REPLICA in connections.databases
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA
@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from core.pool import PooledDatabaseMixin
+
+
+class DatabaseWrapper(PooledDatabaseMixin, base.DatabaseWrapper):
+    pass
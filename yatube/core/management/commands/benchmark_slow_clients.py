@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from core import slow_clients
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure request latency of running servers, e.g. one WSGI and '
+        'one ASGI server, while slow clients keep them busy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', metavar='URL')
+        parser.add_argument('--slow', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.5,
+            help='Seconds slow clients wait between reads.',
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        results = {}
+        for url in options['urls']:
+            results[url] = slow_clients.measure(
+                url,
+                slow=options['slow'],
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                delay=options['delay'],
+                timeout=options['timeout'],
+            )
+        for line in slow_clients.report(results):
+            self.stdout.write(line)
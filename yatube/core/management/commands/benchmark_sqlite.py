@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import sqlite_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent read/write throughput of a scratch SQLite '
+        'database with the default settings and with SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode, pragmas in (
+            ('default', {}),
+            ('tuned', settings.SQLITE_PRAGMAS),
+        ):
+            results[mode] = sqlite_benchmark.measure(
+                pragmas,
+                seconds=options['seconds'],
+                readers=options['readers'],
+                writers=options['writers'],
+                rows=options['rows'],
+            )
+        for line in sqlite_benchmark.report(results):
+            self.stdout.write(line)
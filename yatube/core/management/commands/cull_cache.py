@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired entries of the file caches and make room in the '
+        'full ones; run it periodically, e.g. from cron.'
+    )
+
+    def handle(self, *args, **options):
+        for alias in settings.CACHES:
+            cache = caches[alias]
+            if not hasattr(cache, 'cull'):
+                continue
+            deleted = cache.cull()
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: deleted {deleted} entries'
+            ))
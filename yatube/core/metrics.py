@@ -0,0 +1,160 @@
+"""Per-request performance metrics.
+
+``InstrumentationMiddleware`` opens a ``RequestStats`` for every request
+and the instrumented database wrapper, template backend and cache
+backend add to it. Finished requests are kept per URL name in a rolling
+window of ``METRICS_WINDOW`` samples, summarized by ``snapshot`` and
+checked against the query budgets of ``QUERY_BUDGETS``.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+FIELDS = (
+    'queries',
+    'db_time',
+    'template_time',
+    'cache_hits',
+    'cache_misses',
+    'total_time',
+)
+
+_local = threading.local()
+
+_lock = threading.Lock()
+
+_samples = {}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    """Counters of one request; times are in milliseconds."""
+
+    def __init__(self):
+        for field in FIELDS:
+            setattr(self, field, 0)
+        self.depth = defaultdict(int)
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish():
+    _local.stats = None
+
+
+def add(field, value=1):
+    stats = current()
+    if stats is not None and not stats.depth['batch']:
+        setattr(stats, field, getattr(stats, field) + value)
+
+
+def _ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def timer(field):
+    """Add the time spent in the block; nested blocks count once."""
+    stats = current()
+    if stats is None or stats.depth[field]:
+        yield
+        return
+    stats.depth[field] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.depth[field] -= 1
+        add(field, _ms(started))
+
+
+@contextmanager
+def batch():
+    """Do not count the single cache reads a bulk read is made of."""
+    stats = current()
+    if stats is None:
+        yield
+        return
+    stats.depth['batch'] += 1
+    try:
+        yield
+    finally:
+        stats.depth['batch'] -= 1
+
+
+def query_timer(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` counting queries and their time."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        add('queries')
+        add('db_time', _ms(started))
+
+
+def record(view_name, stats):
+    row = tuple(getattr(stats, field) for field in FIELDS)
+    with _lock:
+        samples = _samples.get(view_name)
+        if samples is None:
+            samples = _samples[view_name] = deque(
+                maxlen=settings.METRICS_WINDOW
+            )
+        samples.append(row)
+
+
+def check_budget(view_name, stats):
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is None or stats.queries <= budget:
+        return
+    message = (
+        f'{view_name} ran {stats.queries} queries, the budget is {budget}'
+    )
+    if settings.QUERY_BUDGET_RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def snapshot():
+    """Summary of the rolling window of every URL name."""
+    with _lock:
+        samples = {name: list(rows) for name, rows in _samples.items()}
+    report = {}
+    for name, rows in sorted(samples.items()):
+        summary = report[name] = {'requests': len(rows)}
+        for index, field in enumerate(FIELDS):
+            values = sorted(row[index] for row in rows)
+            summary[field] = {
+                'mean': round(sum(values) / len(values), 2),
+                'p50': round(_percentile(values, 0.5), 2),
+                'p95': round(_percentile(values, 0.95), 2),
+                'p99': round(_percentile(values, 0.99), 2),
+                'max': round(values[-1], 2),
+            }
+    return report
+
+
+def reset():
+    with _lock:
+        _samples.clear()
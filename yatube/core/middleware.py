@@ -0,0 +1,50 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import db, metrics
+
+
+class InstrumentationMiddleware:
+    """Record query count and time, template time and cache hits.
+
+    The numbers are stored under the resolved URL name, e.g.
+    ``posts:index``. Streamed content is produced after the middleware
+    returns and is not measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.query_timer)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.finish()
+        stats.total_time = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        metrics.record(view_name, stats)
+        metrics.check_budget(view_name, stats)
+        return response
+
+
+class ReadReplicaMiddleware:
+    """Read through the replica connection while serving GET and HEAD."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        with db.read_only_reads():
+            return self.get_response(request)
@@ -0,0 +1,210 @@
+"""Process-wide database connection pools.
+
+The backends in ``core.db_backends`` borrow their connections from a
+``Pool`` instead of opening a new one for every request: ``close()``,
+which Django calls at the end of each request while ``CONN_MAX_AGE`` is
+0, hands the connection back. A borrowed connection is at most
+``MAX_AGE`` seconds old and, with ``HEALTH_CHECKS``, answered a
+``SELECT 1`` right before it was handed out. When ``MAX_SIZE``
+connections are in use, a request waits up to ``TIMEOUT`` seconds for
+one to come back.
+"""
+import threading
+import time
+from collections import deque
+
+
+_pools = {}
+
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class Pool:
+    def __init__(self, alias, max_size=10, max_age=300, timeout=10,
+                 health_checks=True):
+        self.alias = alias
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self.idle = deque()
+        self.in_use = 0
+        self.condition = threading.Condition()
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _expired(self, created):
+        return time.monotonic() - created >= self.max_age
+
+    def _reserve(self, started):
+        """Take a slot, with the most recently used idle connection if
+        there is one.
+        """
+        deadline = started + self.timeout
+        with self.condition:
+            while not self.idle and self.in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self.max_wait_time = max(
+                        self.max_wait_time, time.monotonic() - started
+                    )
+                    raise PoolTimeout(
+                        f'No free connection to {self.alias!r} after '
+                        f'{self.timeout} seconds'
+                    )
+                self.condition.wait(remaining)
+            self.in_use += 1
+            self.checkouts += 1
+            waited = time.monotonic() - started
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+            return self.idle.pop() if self.idle else None
+
+    def checkout(self, connect, is_healthy):
+        """Return ``(connection, created, reused)``.
+
+        ``connect()`` opens a new connection and ``is_healthy(connection)``
+        checks an idle one.
+        """
+        entry = self._reserve(time.monotonic())
+        if entry is not None:
+            connection, created = entry
+            if not self._expired(created) and (
+                not self.health_checks or is_healthy(connection)
+            ):
+                return connection, created, True
+            self._discard(connection)
+        try:
+            connection = connect()
+        except BaseException:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created += 1
+        return connection, time.monotonic(), False
+
+    def release(self, connection, created, reusable=True):
+        with self.condition:
+            self.in_use -= 1
+            keep = reusable and not self._expired(created)
+            if keep:
+                self.idle.append((connection, created))
+            self.condition.notify()
+        if not keep:
+            self._discard(connection)
+
+    def _discard(self, connection):
+        with self.condition:
+            self.discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self.condition:
+            return {
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'discarded': self.discarded,
+                'timeouts': self.timeouts,
+                'wait_ms': {
+                    'mean': round(
+                        self.wait_time * 1000 / max(self.checkouts, 1), 2
+                    ),
+                    'max': round(self.max_wait_time * 1000, 2),
+                },
+            }
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = Pool(
+                alias,
+                max_size=options.get('MAX_SIZE', 10),
+                max_age=options.get('MAX_AGE', 300),
+                timeout=options.get('TIMEOUT', 10),
+                health_checks=options.get('HEALTH_CHECKS', True),
+            )
+        return pool
+
+
+def stats():
+    """``Pool.stats`` of every pool, by database alias."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in sorted(pools.items())}
+
+
+class PooledDatabaseMixin:
+    """``DatabaseWrapper`` mixin borrowing connections from a ``Pool``.
+
+    The pool is configured by the ``POOL`` dictionary of the database
+    settings: ``MAX_SIZE``, ``MAX_AGE``, ``TIMEOUT`` and
+    ``HEALTH_CHECKS``. ``pool_reused`` tells whether the current
+    connection was opened earlier, so per-connection setup can be
+    skipped.
+    """
+
+    health_check_sql = 'SELECT 1'
+
+    pool_reused = False
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection, self._pool_created, self.pool_reused = (
+                self.pool.checkout(
+                    lambda: super(
+                        PooledDatabaseMixin, self
+                    ).get_new_connection(conn_params),
+                    self._is_healthy,
+                )
+            )
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+        return connection
+
+    def _is_healthy(self, connection):
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.health_check_sql)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Closed inside atomic(), the wrapper keeps pointing at the
+        # connection, so it must not be handed to anyone else.
+        reusable = not self.in_atomic_block
+        if reusable:
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                reusable = False
+        self.pool.release(self.connection, self._pool_created, reusable)
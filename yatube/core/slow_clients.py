@@ -0,0 +1,132 @@
+"""Latency of normal requests while slow clients occupy a server.
+
+Slow clients trickle their request headers and read the response a few
+bytes at a time through a small receive buffer, like visitors on a bad
+mobile connection loading an image-heavy page. Meanwhile ordinary
+clients request the same URL, and their latency shows whether the
+server still has workers for them: a pool of sync WSGI workers is tied
+up by the slow clients, an ASGI server only keeps their sockets open.
+
+Run the WSGI and ASGI servers side by side, e.g.
+``gunicorn -w 4 yatube.wsgi`` and ``uvicorn yatube.asgi:application``,
+and point ``benchmark_slow_clients`` at both.
+"""
+import asyncio
+import socket
+import time
+from urllib.parse import urlsplit
+
+
+def _request(url):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return parts.hostname, parts.port or 80, (
+        f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+        f'Connection: close\r\n\r\n'
+    ).encode()
+
+
+async def _open(host, port, receive_buffer=None):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if receive_buffer:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    return await asyncio.open_connection(sock=sock, limit=1024)
+
+
+async def _slow_client(url, delay, stop):
+    host, port, request = _request(url)
+    while not stop.is_set():
+        try:
+            reader, writer = await _open(host, port, receive_buffer=4096)
+        except OSError:
+            await asyncio.sleep(delay)
+            continue
+        try:
+            for start in range(0, len(request), 16):
+                writer.write(request[start:start + 16])
+                await asyncio.sleep(delay)
+            while not stop.is_set() and await reader.read(256):
+                await asyncio.sleep(delay)
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+
+async def _timed_get(url, timeout):
+    host, port, request = _request(url)
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(_open(host, port), timeout)
+    try:
+        writer.write(request)
+        status = await asyncio.wait_for(reader.readline(), timeout)
+        while await asyncio.wait_for(reader.read(65536), timeout):
+            pass
+    finally:
+        writer.close()
+    if status.split()[1:2] != [b'200']:
+        raise OSError(status.decode(errors='replace').strip())
+    return (time.perf_counter() - started) * 1000
+
+
+async def _measure(url, slow, requests, concurrency, delay, timeout):
+    stop = asyncio.Event()
+    slow_clients = [
+        asyncio.ensure_future(_slow_client(url, delay, stop))
+        for _ in range(slow)
+    ]
+    await asyncio.sleep(delay * 2 if slow else 0)
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            try:
+                latencies.append(await _timed_get(url, timeout))
+            except (OSError, asyncio.TimeoutError):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for task in slow_clients:
+        task.cancel()
+    await asyncio.gather(*slow_clients, return_exceptions=True)
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50': round(latencies[len(latencies) // 2], 1) if latencies else None,
+        'p95': (
+            round(latencies[min(len(latencies) - 1,
+                                int(len(latencies) * 0.95))], 1)
+            if latencies else None
+        ),
+    }
+
+
+def measure(url, slow=50, requests=200, concurrency=4, delay=0.5,
+            timeout=30):
+    """Throughput and latency of ``requests`` GETs of ``url`` while
+    ``slow`` slow clients request it too.
+    """
+    return asyncio.run(
+        _measure(url, slow, requests, concurrency, delay, timeout)
+    )
+
+
+def report(results):
+    """Lines of a latency table, one row per URL."""
+    yield f'{"url":<40}{"req/s":>8}{"p50 ms":>10}{"p95 ms":>10}{"errors":>8}'
+    for url, result in results.items():
+        yield (
+            f'{url:<40}{result["rps"]:>8}{result["p50"]!s:>10}'
+            f'{result["p95"]!s:>10}{result["errors"]:>8}'
+        )
@@ -0,0 +1,120 @@
+"""Concurrent read/write throughput of SQLite with and without pragmas.
+
+Readers run the index query (the latest posts) while writers insert
+posts one transaction at a time, all on their own connections to a
+scratch database, so the project database is never touched. With the
+default rollback journal a writer locks readers out while it commits; in
+WAL mode both go on side by side.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .db import apply_pragmas
+
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    'id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL, pub_date REAL NOT NULL)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+)
+
+READ = 'SELECT id, author_id, text FROM post ORDER BY pub_date DESC LIMIT 10'
+
+WRITE = 'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)'
+
+
+def _connect(path, pragmas):
+    # The busy timeout comes from the pragmas, or sqlite3's default.
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    apply_pragmas(connection.cursor(), pragmas)
+    return connection
+
+
+def _create(path, rows):
+    connection = sqlite3.connect(path)
+    for sql in SCHEMA:
+        connection.execute(sql)
+    now = time.time()
+    connection.executemany(WRITE, (
+        (number % 100, 'x' * 200, now - number) for number in range(rows)
+    ))
+    connection.commit()
+    connection.close()
+
+
+class _Worker(threading.Thread):
+    def __init__(self, path, pragmas, work, deadline):
+        super().__init__(daemon=True)
+        self.path = path
+        self.pragmas = pragmas
+        self.work = work
+        self.deadline = deadline
+        self.done = 0
+        self.errors = 0
+
+    def run(self):
+        connection = _connect(self.path, self.pragmas)
+        rng = random.Random(self.ident)
+        try:
+            while time.monotonic() < self.deadline:
+                try:
+                    self.work(connection, rng)
+                    self.done += 1
+                except sqlite3.OperationalError:
+                    # "database is locked" after the busy timeout.
+                    self.errors += 1
+        finally:
+            connection.close()
+
+
+def _read(connection, rng):
+    connection.execute(READ).fetchall()
+
+
+def _write(connection, rng):
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(WRITE, (rng.randrange(100), 'y' * 200, time.time()))
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def measure(pragmas, seconds=5, readers=4, writers=1, rows=10000):
+    """Reads, writes and lock errors per second under ``pragmas``."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        _create(path, rows)
+        # The journal mode is persistent: set it before the workers start.
+        _connect(path, pragmas).close()
+        deadline = time.monotonic() + seconds
+        workers = [
+            _Worker(path, pragmas, _read, deadline) for _ in range(readers)
+        ] + [
+            _Worker(path, pragmas, _write, deadline) for _ in range(writers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return {
+        'reads': sum(w.done for w in workers if w.work is _read) / seconds,
+        'writes': sum(w.done for w in workers if w.work is _write) / seconds,
+        'errors': sum(w.errors for w in workers) / seconds,
+    }
+
+
+def report(results):
+    """Lines of a throughput table, one row per configuration."""
+    yield f'{"mode":<10}{"reads/s":>12}{"writes/s":>12}{"locked/s":>12}'
+    for mode, result in results.items():
+        yield (
+            f'{mode:<10}{result["reads"]:>12.0f}{result["writes"]:>12.0f}'
+            f'{result["errors"]:>12.1f}'
+        )
@@ -0,0 +1,329 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from socketserver import ThreadingMixIn
+from unittest import mock
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import db, slow_clients
+from core.backends import LockingFileBasedCache
+from core.asgi import WsgiToAsgi
+from core.cache import TieredCache
+from core.pool import Pool, PoolTimeout
+from posts.models import Group
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-tests',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        # Two workers: separate L1 stores over the same L2.
+        self.first = TieredCache('first', {'OPTIONS': {'L1_TIMEOUT': 60}})
+        self.second = TieredCache('second', {'OPTIONS': {'L1_TIMEOUT': 60}})
+        self.first.clear()
+        self.second.clear()
+
+    def new_request(self):
+        request_started.send(sender=self.__class__)
+
+    def test_values_are_shared_through_l2(self):
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.assertEqual(self.second.get_many(['key', 'none']), {
+            'key': 'value'
+        })
+        self.assertIsNone(self.first.get('none'))
+
+    def test_l1_answers_without_l2(self):
+        self.first.set('key', [1])
+        self.first.get('key').append(2)
+        self.first.l2.delete('key')
+        self.assertEqual(self.first.get('key'), [1])
+
+    def test_writes_invalidate_other_workers(self):
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.new_request()
+        self.assertEqual(self.second.get('key'), 'new')
+        self.first.delete('key')
+        self.new_request()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_own_writes_keep_l1(self):
+        self.first.set('key', 'value')
+        self.first.set('other', 'value')
+        self.first.l2.delete('key')
+        self.new_request()
+        self.assertEqual(self.first.get('key'), 'value')
+
+    def test_unchanged_generations_are_not_read(self):
+        self.first.set('key', 'value')
+        self.new_request()
+        self.second.get('key')
+        l2 = caches['shared']
+        with mock.patch.object(l2, 'get_many', wraps=l2.get_many) as get_many:
+            self.new_request()
+            self.assertEqual(self.second.get('key'), 'value')
+            get_many.assert_not_called()
+            self.first.set('key', 'new')
+            self.new_request()
+            self.assertEqual(self.second.get('key'), 'new')
+            get_many.assert_called_once()
+
+    def test_l2_only_keys_bump_nothing(self):
+        cache = TieredCache('locks', {'OPTIONS': {'L2_ONLY': ('lock:',)}})
+        cache.clear()
+        self.assertTrue(cache.add('lock:page', 1))
+        self.assertFalse(self.second.add('lock:page', 1))
+        cache.delete('lock:page')
+        self.assertIsNone(cache.l2.get('tiered-generation'))
+        self.assertEqual(cache.store.entries, {})
+
+    def test_lru_eviction(self):
+        cache = TieredCache('small', {'OPTIONS': {'L1_MAX_ENTRIES': 2}})
+        cache.clear()
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        cache.get('b')
+        self.assertEqual(list(cache.store.entries), [
+            cache.make_key('c'), cache.make_key('b')
+        ])
+        self.assertEqual(cache.get('a'), 'a')
+
+
+class LockingFileBasedCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+
+    def run_concurrently(self, func, threads=8):
+        workers = [threading.Thread(target=func) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def test_incr_and_add_are_atomic(self):
+        # Separate instances stand for separate processes.
+        LockingFileBasedCache(self.location, {}).set('counter', 0)
+        added = []
+
+        def work():
+            cache = LockingFileBasedCache(self.location, {})
+            for _ in range(25):
+                cache.incr('counter')
+            added.append(cache.add('lock', 1))
+        self.run_concurrently(work)
+        cache = LockingFileBasedCache(self.location, {})
+        self.assertEqual(cache.get('counter'), 200)
+        self.assertEqual(added.count(True), 1)
+
+    def test_cull_keeps_entries_without_timeout(self):
+        cache = LockingFileBasedCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 1},
+        })
+        cache.set('version', 1, None)
+        cache.set('expired', 1, -1)
+        for key in range(5):
+            cache.set(key, key, 60)
+        # Writes leave culling to the cull_cache command.
+        self.assertEqual(len(cache._list_cache_files()), 7)
+        self.assertEqual(cache.cull(), 6)
+        self.assertEqual(cache._list_cache_files(), [
+            cache._key_to_file('version')
+        ])
+
+
+class SqliteTest(TestCase):
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone(), (1,))
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone(), (5000,))
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite', seconds=0.2, rows=100, stdout=out
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], [
+            'mode', 'default', 'tuned'
+        ])
+
+
+class ReadReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = db.ReadReplicaRouter()
+        replica = {'replica': connections.databases['default']}
+        patcher = mock.patch.dict(connections.databases, replica)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_replica_only_when_read_only(self):
+        self.assertIsNone(self.router.db_for_read(Group))
+        with db.read_only_reads():
+            self.assertEqual(self.router.db_for_read(Group), 'replica')
+            self.assertEqual(self.router.db_for_write(Group), 'default')
+        self.assertIsNone(self.router.db_for_read(Group))
+
+    def test_reads_in_transactions_stay_on_default(self):
+        default = connections['default']
+        with db.read_only_reads(), \
+                mock.patch.object(default, 'in_atomic_block', True):
+            self.assertIsNone(self.router.db_for_read(Group))
+
+    def test_replica_is_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class PoolTest(SimpleTestCase):
+    def setUp(self):
+        self.pool = Pool('test', max_size=2, timeout=0.05)
+
+    def test_connections_are_reused(self):
+        first, created, reused = self.pool.checkout(FakeConnection, bool)
+        self.assertFalse(reused)
+        self.pool.release(first, created)
+        again, created, reused = self.pool.checkout(FakeConnection, bool)
+        self.assertIs(again, first)
+        self.assertTrue(reused)
+        stats = self.pool.stats()
+        self.assertEqual((stats['in_use'], stats['idle']), (1, 0))
+        self.assertEqual((stats['checkouts'], stats['created']), (2, 1))
+
+    def test_unhealthy_and_old_connections_are_replaced(self):
+        first, created, reused = self.pool.checkout(FakeConnection, bool)
+        self.pool.release(first, created)
+        second, created, reused = self.pool.checkout(
+            FakeConnection, lambda connection: False
+        )
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.pool.release(second, created - self.pool.max_age)
+        self.assertTrue(second.closed)
+        self.assertEqual(self.pool.stats()['discarded'], 2)
+
+    def test_checkout_waits_for_a_free_connection(self):
+        for _ in range(2):
+            self.pool.checkout(FakeConnection, bool)
+        with self.assertRaises(PoolTimeout):
+            self.pool.checkout(FakeConnection, bool)
+        stats = self.pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertGreaterEqual(stats['wait_ms']['max'], 50)
+
+
+def hello(environ, start_response):
+    body = environ['wsgi.input'].read(
+        int(environ.get('CONTENT_LENGTH') or 0)
+    )
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [
+        environ['REQUEST_METHOD'].encode(), b' ',
+        environ['PATH_INFO'].encode('latin1'), b'?',
+        environ['QUERY_STRING'].encode(), b' ',
+        environ.get('HTTP_X_TEST', '').encode(), b' ', body,
+    ]
+
+
+class WsgiToAsgiTest(SimpleTestCase):
+    def call(self, application, scope, messages):
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def test_http_request(self):
+        sent = self.call(WsgiToAsgi(hello), {
+            'type': 'http',
+            'method': 'POST',
+            'path': '/päth/',
+            'query_string': b'a=1',
+            'http_version': '1.1',
+            'headers': [
+                (b'content-length', b'4'),
+                (b'x-test', b'one'),
+                (b'x-test', b'two'),
+            ],
+        }, [
+            {'type': 'http.request', 'body': b'bo', 'more_body': True},
+            {'type': 'http.request', 'body': b'dy'},
+        ])
+        self.assertEqual(sent[0], {
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in sent[1:]),
+            'POST /päth/?a=1 one,two body'.encode(),
+        )
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_lifespan(self):
+        sent = self.call(WsgiToAsgi(hello), {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'},
+        ])
+        self.assertEqual([message['type'] for message in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete',
+        ])
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class SlowClientsTest(SimpleTestCase):
+    def test_measure(self):
+        server = ThreadingServer(('127.0.0.1', 0), QuietHandler)
+        server.set_app(hello)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_port}/'
+        result = slow_clients.measure(
+            url, slow=2, requests=10, concurrency=2, delay=0.01
+        )
+        self.assertEqual((result['requests'], result['errors']), (10, 0))
+        self.assertGreater(result['rps'], 0)
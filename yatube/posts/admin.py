@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .models import Blob, Comment, Follow, Group, Post
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -49,7 +49,19 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('user', 'author')
 
 
+class BlobAdmin(admin.ModelAdmin):
+    list_display = (
+        'name',
+        'size',
+        'ref_count',
+        'touched_at'
+    )
+    search_fields = ('name',)
+    list_filter = ('ref_count',)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Blob, BlobAdmin)
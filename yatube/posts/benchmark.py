@@ -0,0 +1,252 @@
+"""Benchmark data and runner for the public post views.
+
+``seed`` fills the database with a reproducible data set: users whose
+activity and popularity follow a power law, so a few authors write most
+posts and gather most followers. ``run`` requests every view through the
+test client and reads latency and queries from ``core.metrics``;
+``compare`` tells which views got slower between two runs.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from core import metrics
+
+from . import caching
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .utils import chunks, pk_batches, update_by_pk
+
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+
+
+def _log(stdout, message):
+    if stdout is not None:
+        stdout.write(message)
+
+
+def _weights(rng, count):
+    """Cumulative power-law weights for ``random.choices``."""
+    return list(itertools.accumulate(
+        rng.paretovariate(1.2) for _ in range(count)
+    ))
+
+
+def _insert(model, objects, **kwargs):
+    for batch in chunks(objects, BATCH_SIZE):
+        model.objects.bulk_create(batch, **kwargs)
+
+
+def seed(users, posts, groups, follows, comments, seed=0, stdout=None):
+    """Create a benchmark data set; usernames and slugs start with
+    ``bench-<seed>-`` so several seeds can share a database.
+    """
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    prefix = f'bench-{seed}-'
+    password = make_password(None)
+
+    _insert(User, (
+        User(
+            username=f'{prefix}{number}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            password=password,
+        )
+        for number in range(users)
+    ))
+    user_ids = list(User.objects.filter(
+        username__startswith=prefix
+    ).order_by('pk').values_list('pk', flat=True))
+    _log(stdout, f'Created {len(user_ids)} users')
+
+    _insert(Group, (
+        Group(
+            title=fake.catch_phrase()[:200],
+            slug=f'{prefix}{number}',
+            description=fake.text(),
+        )
+        for number in range(groups)
+    ))
+    group_ids = list(Group.objects.filter(
+        slug__startswith=prefix
+    ).values_list('pk', flat=True))
+
+    last_post = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+    activity = _weights(rng, len(user_ids))
+    start = timezone.now() - timedelta(days=365)
+    step = timedelta(days=365) / max(posts, 1)
+    _insert(Post, (
+        Post(
+            author_id=rng.choices(user_ids, cum_weights=activity)[0],
+            group_id=(
+                rng.choice(group_ids)
+                if group_ids and rng.random() < 0.7 else None
+            ),
+            text=fake.paragraph(nb_sentences=rng.randint(1, 6)),
+        )
+        for _ in range(posts)
+    ))
+    # Spread the new posts over the last year, in insertion order.
+    new_ids = itertools.chain.from_iterable(
+        pk_batches(Post.objects.filter(pk__gt=last_post))
+    )
+    update_by_pk(Post.objects, 'pub_date', (
+        (pk, start + step * number) for number, pk in enumerate(new_ids)
+    ))
+    _log(stdout, f'Created {posts} posts')
+
+    popularity = _weights(rng, len(user_ids))
+    _insert(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in set(rng.choices(
+            user_ids,
+            cum_weights=popularity,
+            k=rng.randint(0, 2 * follows),
+        ))
+        if author_id != user_id
+    ), ignore_conflicts=True)
+    _log(stdout, 'Created the follow graph')
+
+    post_ids = Post.objects.filter(pk__gt=last_post).aggregate(
+        low=Min('pk'), high=Max('pk')
+    )
+    if post_ids['low'] is not None:
+        _insert(Comment, (
+            Comment(
+                post_id=rng.randint(post_ids['low'], post_ids['high']),
+                author_id=rng.choice(user_ids),
+                text=fake.sentence(),
+            )
+            for _ in range(comments)
+        ))
+
+    # bulk_create sends no signals: rebuild what they maintain.
+    for command in ('recount', 'rebuild_timelines', 'reindex_search'):
+        call_command(command, stdout=stdout)
+    caching.bump(caching.INDEX)
+
+
+class Targets:
+    """Random URLs of every view over the existing data."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.slugs = list(
+            Group.objects.values_list('slug', flat=True)[:1000]
+        )
+        self.authors = list(AuthorStats.objects.filter(
+            post_count__gt=0
+        ).order_by('-post_count').values_list('user__username', flat=True)[
+            :1000
+        ])
+        self.posts = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+
+    def url(self, view):
+        rng = self.rng
+        if view == 'posts:index':
+            return reverse(view) + f'?page={rng.randint(1, 5)}'
+        if view == 'posts:group_list':
+            return reverse(view, args=(rng.choice(self.slugs),))
+        if view == 'posts:profile':
+            return reverse(view, args=(rng.choice(self.authors),))
+        if view == 'posts:post_detail':
+            return reverse(view, args=(
+                rng.randint(self.posts['low'], self.posts['high']),
+            ))
+        return reverse(view)
+
+    def available(self, view):
+        if view == 'posts:group_list':
+            return bool(self.slugs)
+        if view == 'posts:profile':
+            return bool(self.authors)
+        if view == 'posts:post_detail':
+            return self.posts['low'] is not None
+        return True
+
+
+def run(requests, warmup=10, user=None, seed=0, stdout=None):
+    """Request every view and return the ``core.metrics`` summary.
+
+    Anonymous runs skip ``follow_index`` and mostly measure the page
+    cache.
+    """
+    rng = random.Random(seed)
+    targets = Targets(rng)
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    views = [
+        view for view in VIEWS
+        if targets.available(view)
+        and (user is not None or view != 'posts:follow_index')
+    ]
+    results = {}
+    with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+        for view in views:
+            for _ in range(warmup):
+                client.get(targets.url(view))
+            metrics.reset()
+            for _ in range(requests):
+                client.get(targets.url(view))
+            results[view] = metrics.snapshot()[view]
+            _log(stdout, f'{view}: {requests} requests')
+    return results
+
+
+def report(results):
+    """Lines of a latency and query table."""
+    yield (
+        f'{"view":<20}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+        f'{"queries":>10}{"max":>6}'
+    )
+    for view, summary in results.items():
+        latency, queries = summary['total_time'], summary['queries']
+        yield (
+            f'{view:<20}{latency["p50"]:>10}{latency["p95"]:>10}'
+            f'{latency["p99"]:>10}{queries["mean"]:>10}{queries["max"]:>6}'
+        )
+
+
+def compare(baseline, results, threshold):
+    """Regressions of ``results`` against ``baseline``.
+
+    A view regresses when its p95 latency grew by more than
+    ``threshold`` (a fraction) or when it runs more queries.
+    """
+    regressions = []
+    for view in baseline.keys() & results.keys():
+        old, new = baseline[view], results[view]
+        old_p95, new_p95 = old['total_time']['p95'], new['total_time']['p95']
+        if new_p95 > old_p95 * (1 + threshold):
+            regressions.append(
+                f'{view}: p95 latency {old_p95} ms -> {new_p95} ms'
+            )
+        if new['queries']['max'] > old['queries']['max']:
+            regressions.append(
+                f'{view}: queries {old["queries"]["max"]} -> '
+                f'{new["queries"]["max"]}'
+            )
+    return sorted(regressions)
@@ -0,0 +1,220 @@
+"""Generational cache namespaces for the post pages.
+
+Every feed ("scope": the index, a group, an author, a post) has a version
+stored in the cache. Writes bump the versions of the scopes they touch,
+and cache keys include those versions, so cached entries can live long
+and are still never served after a change. Versions are millisecond
+timestamps, which also tells when a scope was last modified.
+
+``cache_anonymous_page`` builds on the versions to cache whole responses
+for anonymous visitors, and ``conditional_page`` to answer repeated
+requests with 304 Not Modified.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+
+VERSION_KEY = 'feed-version:{}'
+
+PAGE_KEY = 'page:{}'
+
+PAGE_LOCK_KEY = 'page-lock:{}'
+
+INDEX = 'index'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def _now():
+    return int(time.time() * 1000)
+
+
+def feed_versions(*scopes):
+    """Return the current version of each scope, starting new ones."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: _now() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return tuple(versions[key] for key in keys)
+
+
+def request_scopes(request, scopes, args, kwargs):
+    """``scopes(request, *args, **kwargs)`` memoized on the request."""
+    memo = request.__dict__.setdefault('_feed_scopes', {})
+    if scopes not in memo:
+        memo[scopes] = tuple(scopes(request, *args, **kwargs))
+    return memo[scopes]
+
+
+def request_versions(request, scopes):
+    """``feed_versions`` memoized on the request."""
+    memo = request.__dict__.setdefault('_feed_versions', {})
+    scopes = tuple(scopes)
+    if scopes not in memo:
+        memo[scopes] = feed_versions(*scopes)
+    return memo[scopes]
+
+
+def bump(*scopes):
+    """Move the given scopes to a new version."""
+    keys = [VERSION_KEY.format(scope) for scope in set(scopes)]
+    current = cache.get_many(keys)
+    now = _now()
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys},
+        None,
+    )
+
+
+def post_scopes(post, group_slug=None):
+    """Scopes showing a post: the index, its group, author and page."""
+    scopes = [INDEX, author_scope(post.author.username), post_scope(post.pk)]
+    if post.group_id:
+        scopes.append(group_scope(post.group.slug))
+    if group_slug:
+        scopes.append(group_scope(group_slug))
+    return scopes
+
+
+def _cached_response(entry):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    return response
+
+
+def _store(key, versions, response):
+    if response.streaming or response.status_code != 200:
+        return
+    cache.set(key, {
+        'versions': versions,
+        'fresh_until': time.time() + settings.PAGE_CACHE_TIMEOUT,
+        'content': response.content,
+        'status': response.status_code,
+        'headers': list(response.items()),
+    }, settings.PAGE_CACHE_TIMEOUT + settings.PAGE_CACHE_GRACE)
+
+
+def _wait_for(key, versions):
+    """Give the worker holding the lock a moment to store the page."""
+    for _ in range(settings.PAGE_CACHE_WAIT_STEPS):
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry['versions'] == versions:
+            return entry
+    return None
+
+
+def _cached_response_of(view, scopes, request, args, kwargs):
+    versions = request_versions(
+        request, request_scopes(request, scopes, args, kwargs)
+    )
+    # Feeds link to absolute URLs, which name the scheme and the host.
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    key = PAGE_KEY.format(digest)
+    lock = PAGE_LOCK_KEY.format(digest)
+    entry = cache.get(key)
+    if (entry is not None and entry['versions'] == versions
+            and entry['fresh_until'] > time.time()):
+        return _cached_response(entry)
+    if cache.add(lock, 1, settings.PAGE_CACHE_LOCK):
+        try:
+            response = view(request, *args, **kwargs)
+            _store(key, versions, response)
+        finally:
+            cache.delete(lock)
+        return response
+    entry = entry or _wait_for(key, versions)
+    if entry is not None:
+        return _cached_response(entry)
+    return view(request, *args, **kwargs)
+
+
+def cache_anonymous_page(scopes):
+    """Cache the responses of a view for anonymous visitors.
+
+    ``scopes(request, *args, **kwargs)`` returns the feed scopes the page
+    shows; the cached response is replaced as soon as one of them gets a
+    new version. Only one worker rebuilds an outdated page at a time,
+    the others serve the previous copy or wait briefly for the new one.
+    Authenticated users always get a freshly rendered page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            response = _cached_response_of(
+                view, scopes, request, args, kwargs
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_public_page(scopes):
+    """Like ``cache_anonymous_page`` for pages that are the same for
+    every visitor, such as syndication feeds.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            return _cached_response_of(view, scopes, request, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def conditional_page(scopes, per_user=True, csrf=False):
+    """Send ETag and Last-Modified computed from the scope versions.
+
+    Nothing is rendered to compute them. Unless ``per_user`` is false the
+    ETag also names the user, because the header, the follow button and
+    the comment form differ between visitors. Pages with a form set
+    ``csrf``: their ETag includes the CSRF cookie, which changes when the
+    user logs in again, so a page with an outdated token is not reused.
+    """
+    def etag(request, *args, **kwargs):
+        versions = request_versions(
+            request, request_scopes(request, scopes, args, kwargs)
+        )
+        user = 'anon'
+        if per_user and request.user.is_authenticated:
+            user = request.user.pk
+        token = ''
+        if csrf:
+            # Makes sure a new visitor gets the cookie the ETag names.
+            get_token(request)
+            token = request.META['CSRF_COOKIE']
+        return hashlib.md5(f'{user}:{token}:{versions}'.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        versions = request_versions(
+            request, request_scopes(request, scopes, args, kwargs)
+        )
+        return datetime.fromtimestamp(max(versions) / 1000, timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
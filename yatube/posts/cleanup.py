@@ -0,0 +1,227 @@
+"""Garbage collection of media files that nothing uses any more.
+
+Storage directories are walked with ``os.scandir`` and their files are
+checked ``BATCH_SIZE`` at a time, each batch with a query or two and a
+set difference, so memory use does not grow with the number of files,
+posts or thumbnails:
+
+* an image in ``posts/`` is used by the posts having it as ``image``;
+  the files with a ``Blob`` row are left to ``storage.collect``, which
+  deletes them once no post has referenced them for ``BLOB_GC_GRACE``
+  seconds, since an upload of the same bytes reuses them;
+* a variant in ``posts/variants/`` is used while a post has the image
+  it was made from, as recorded in ``Post.image_stem``;
+* a thumbnail in ``cache/`` is used while sorl's key-value store knows
+  it.
+
+Before the thumbnails are scanned, the key-value store entries of source
+images no post uses are dropped together with their thumbnails, also
+batch by batch. Files modified within ``grace`` seconds are skipped, as
+they may belong to an upload or a thumbnail still being written.
+Nothing is deleted unless ``delete`` is set; the orphans are counted
+either way.
+"""
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.template.defaultfilters import filesizeformat
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import images, thumbnails
+from .models import Blob, Post
+from .storage import collect as collect_blobs
+
+
+BATCH_SIZE = 500
+
+
+class Report:
+    """Files scanned and orphans found, with the scan rate."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.files = 0
+        self.orphans = 0
+        self.size = 0
+
+    def add(self, size, files=1):
+        self.orphans += files
+        self.size += size
+
+    def summary(self, deleted):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        verb = 'reclaimed' if deleted else 'reclaimable'
+        return (
+            f'Scanned {self.files} files ({self.files / elapsed:.0f} '
+            f'files/s); {self.orphans} orphans, '
+            f'{filesizeformat(self.size)} {verb}'
+        )
+
+
+def _batches(iterable):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, BATCH_SIZE))
+        if not batch:
+            return
+        yield batch
+
+
+def _files(storage, directory, skip=()):
+    """Names, sizes and modification times of the files under a directory,
+    depth first, one directory listing at a time.
+    """
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = os.scandir(storage.path(current))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = f'{current}/{entry.name}'
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in skip:
+                        pending.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    yield name, stat.st_size, stat.st_mtime
+
+
+def _orphans(storage, directory, used, report, grace, skip=()):
+    """Batches of the old files under a directory that ``used`` (called
+    with a list of names, returning the used ones) does not return.
+    """
+    cutoff = time.time() - grace
+    for batch in _batches(_files(storage, directory, skip)):
+        report.files += len(batch)
+        sizes = {name: size for name, size, mtime in batch if mtime < cutoff}
+        if not sizes:
+            continue
+        unused = sizes.keys() - used(list(sizes))
+        if unused:
+            yield {name: sizes[name] for name in sorted(unused)}
+
+
+def _used_images(names):
+    """The images posts use, and the ``Blob`` files, which are collected
+    by ``storage.collect`` instead.
+    """
+    return set(Post.objects.filter(image__in=names).values_list(
+        'image', flat=True
+    )) | set(Blob.objects.filter(name__in=names).values_list(
+        'name', flat=True
+    ))
+
+
+def _used_variants(names):
+    sources = {
+        name: images.stem(name).rsplit('-', 1)[0] for name in names
+    }
+    used = set(Post.objects.filter(
+        image_stem__in=set(sources.values())
+    ).values_list('image_stem', flat=True))
+    return {name for name, stem in sources.items() if stem in used}
+
+
+def _used_thumbnails(names):
+    keys = {
+        add_prefix(ImageFile(name, default.storage).key): name
+        for name in names
+    }
+    values = thumbnails.lookup(list(keys))
+    return {keys[key] for key, value in values.items() if value}
+
+
+def _keys(identity):
+    """The key-value store keys of an identity, without the prefix."""
+    prefix = add_prefix('', identity)
+    if not isinstance(default.kvstore, KVStore):
+        yield from map(del_prefix, default.kvstore._find_keys_raw(prefix))
+        return
+    last = prefix
+    while True:
+        batch = list(KVStoreModel.objects.filter(
+            key__startswith=prefix, key__gt=last
+        ).order_by('key').values_list('key', flat=True)[:BATCH_SIZE])
+        if not batch:
+            return
+        yield from map(del_prefix, batch)
+        last = batch[-1]
+
+
+def _drop_thumbnails(source, report, delete):
+    kvstore = default.kvstore
+    for key in kvstore._get(source.key, identity='thumbnails') or ():
+        thumbnail = kvstore._get(key)
+        if thumbnail is None:
+            continue
+        size = 0
+        if thumbnail.storage.exists(thumbnail.name):
+            size = thumbnail.storage.size(thumbnail.name)
+        report.add(size)
+        if delete:
+            kvstore.delete(thumbnail, delete_thumbnails=False)
+            thumbnail.delete()
+    if delete:
+        kvstore.delete(source)
+
+
+def drop_unused_sources(report, delete=False):
+    """Forget the thumbnails of images that no post uses."""
+    for batch in _batches(_keys('thumbnails')):
+        values = thumbnails.lookup([add_prefix(key) for key in batch])
+        sources = [
+            deserialize_image_file(value) for value in values.values()
+            if value
+        ]
+        used = set(Post.objects.filter(
+            image__in=[source.name for source in sources]
+        ).values_list('image', flat=True))
+        for source in sources:
+            if source.name not in used:
+                _drop_thumbnails(source, report, delete)
+
+
+def _remove(storage, batches, report, delete):
+    """Count, and with ``delete`` remove, batches of orphans."""
+    for orphans in batches:
+        for name, size in orphans.items():
+            report.add(size)
+            if delete:
+                storage.delete(name)
+
+
+def collect(grace, delete=False):
+    """Find, and with ``delete`` remove, the unused media files."""
+    report = Report()
+    files, size = collect_blobs(settings.BLOB_GC_GRACE, dry_run=not delete)
+    report.add(size, files)
+    storage = Post._meta.get_field('image').storage
+    _remove(storage, _orphans(
+        storage, 'posts', _used_images, report, grace,
+        skip=(images.VARIANTS_DIR,),
+    ), report, delete)
+    _remove(default_storage, _orphans(
+        default_storage, images.VARIANTS_DIR, _used_variants, report, grace
+    ), report, delete)
+    drop_unused_sources(report, delete)
+    _remove(default.storage, _orphans(
+        default.storage,
+        sorl_settings.THUMBNAIL_PREFIX.rstrip('/'),
+        _used_thumbnails,
+        report,
+        grace,
+    ), report, delete)
+    return report
@@ -0,0 +1,114 @@
+"""Denormalized counters for profiles and post pages.
+
+The write paths adjust the counters in place with F-expressions, so a
+page shows them without a single ``COUNT(*)``. ``recount_authors`` and
+``recount_comments`` rebuild them from the source tables in batches.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+from .utils import chunks, pk_batches
+
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def _shift(field, delta):
+    return Greatest(F(field) + delta, Value(0))
+
+
+def bump_author(user_id, **deltas):
+    """Shift author counters, e.g. ``bump_author(pk, post_count=1)``.
+
+    A missing row is left to a ``recount_authors`` job; ``stats_for``
+    recounts it on demand until the job has run.
+    """
+    from .tasks import recount_authors
+
+    updated = AuthorStats.objects.filter(user_id=user_id).update(**{
+        field: _shift(field, delta) for field, delta in deltas.items()
+    })
+    if not updated:
+        recount_authors.delay(user_id)
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=_shift('comment_count', delta)
+    )
+
+
+def stats_for(user):
+    """Return the counters of a user, creating them if they are missing."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        recount_authors((user.pk,))
+        return AuthorStats.objects.get(user=user)
+
+
+def _counts(queryset, field, user_ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': user_ids})
+        .order_by()
+        .values_list(field)
+        .annotate(total=Count('pk'))
+    )
+
+
+def recount_authors(user_ids=None):
+    """Recompute author counters; all users when no ids are given."""
+    if user_ids is None:
+        batches = pk_batches(User.objects, BATCH_SIZE)
+    else:
+        batches = chunks(user_ids, BATCH_SIZE)
+    recounted = 0
+    for batch in batches:
+        posts = _counts(Post.objects, 'author_id', batch)
+        followers = _counts(Follow.objects, 'author_id', batch)
+        following = _counts(Follow.objects, 'user_id', batch)
+        stats = [
+            AuthorStats(
+                user_id=pk,
+                post_count=posts.get(pk, 0),
+                follower_count=followers.get(pk, 0),
+                following_count=following.get(pk, 0),
+            )
+            for pk in batch
+        ]
+        existing = set(AuthorStats.objects.filter(
+            user_id__in=batch
+        ).values_list('user_id', flat=True))
+        AuthorStats.objects.bulk_update(
+            [row for row in stats if row.user_id in existing],
+            ('post_count', 'follower_count', 'following_count'),
+        )
+        AuthorStats.objects.bulk_create(
+            [row for row in stats if row.user_id not in existing],
+            ignore_conflicts=True,
+        )
+        recounted += len(batch)
+    return recounted
+
+
+def recount_comments(post_ids=None):
+    """Recompute ``Post.comment_count``; all posts when no ids are given."""
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk')).values('total')
+    if post_ids is None:
+        batches = pk_batches(Post.objects, BATCH_SIZE)
+    else:
+        batches = chunks(post_ids, BATCH_SIZE)
+    recounted = 0
+    for batch in batches:
+        recounted += Post.objects.filter(pk__in=batch).update(
+            comment_count=Coalesce(
+                Subquery(comments, output_field=IntegerField()), 0
+            )
+        )
+    return recounted
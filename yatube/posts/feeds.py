@@ -0,0 +1,109 @@
+"""RSS and Atom feeds of the global, group and author timelines.
+
+The feeds are the same for every reader, so they are rendered once per
+feed version, served from the page cache and answered with 304 Not
+Modified through the version ETag.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from . import caching
+from .models import Group, Post
+from .views import group_scopes, index_scopes, profile_scopes
+
+
+User = get_user_model()
+
+
+class PostsFeed(Feed):
+    title = 'Yatube'
+    description = 'The latest posts on Yatube'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj=None):
+        return self.posts(obj).select_related(
+            'author', 'group'
+        ).order_by('-pub_date', '-id')[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(8)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_categories(self, item):
+        return (item.group.title,) if item.group_id else ()
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=(obj.slug,))
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'The latest posts of {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=(obj.username,))
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+def atom(feed_class):
+    return type(f'Atom{feed_class.__name__}', (feed_class,), {
+        'feed_type': Atom1Feed,
+        'subtitle': feed_class.description,
+    })
+
+
+def cached_feed(feed, scopes):
+    return caching.conditional_page(scopes, per_user=False)(
+        caching.cache_public_page(scopes)(feed)
+    )
+
+
+index_rss = cached_feed(PostsFeed(), index_scopes)
+index_atom = cached_feed(atom(PostsFeed)(), index_scopes)
+group_rss = cached_feed(GroupFeed(), group_scopes)
+group_atom = cached_feed(atom(GroupFeed)(), group_scopes)
+profile_rss = cached_feed(AuthorFeed(), profile_scopes)
+profile_atom = cached_feed(atom(AuthorFeed)(), profile_scopes)
@@ -1,5 +1,6 @@
 from django import forms
 
+from . import images
 from .models import Comment, Post
 
 
@@ -16,6 +17,13 @@ class PostForm(forms.ModelForm):
             'text': 'Some text',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # A new upload, rather than the image the post already has.
+        if image and hasattr(image, 'image'):
+            images.validate(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,261 @@
+"""Validation and re-encoding of uploaded post images.
+
+``PostForm`` rejects uploads over ``POST_IMAGE_MAX_BYTES`` or with a side
+over ``POST_IMAGE_MAX_SIDE``; nothing is re-encoded while the request
+waits. Saving a post with a new image then schedules ``process``, which
+first re-encodes the stored image in its own format without EXIF (GPS
+position included), ICC or other metadata and moves the posts using it
+to the stripped copy; images without metadata are kept as they are.
+The unused original is left to ``collect_blobs``. ``process`` then
+re-encodes the image once per width of ``POST_IMAGE_WIDTHS`` (and at
+its own width when it is narrower) into ``POST_IMAGE_FORMAT``. The
+stored image stays as the source of the variants; pages show the
+variants through ``srcset`` and ``src`` once they exist.
+
+Pillow runs in a process pool of ``POST_IMAGE_PROCESSES`` processes,
+which only get and return bytes; storage and database work stays in the
+``run_tasks`` worker, or on the thumbnail thread pool with
+``TASKS_EAGER``.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from tasks.queue import task
+
+from . import caching, storage, thumbnails
+
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'posts/variants'
+
+EXTENSIONS = {'JPEG': 'jpg'}
+
+# Image info that is not metadata; everything else is dropped.
+KEEP_INFO = ('transparency', 'duration', 'loop', 'background', 'disposal')
+
+METADATA = (
+    'exif', 'icc_profile', 'xmp', 'XML:com.adobe.xmp', 'photoshop',
+    'comment',
+)
+
+_pool = None
+
+
+def validate(image):
+    """Raise ``ValidationError`` for uploads that are too large."""
+    if image.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'The image must not be larger than %(limit)s.',
+            code='image_too_large',
+            params={'limit': filesizeformat(settings.POST_IMAGE_MAX_BYTES)},
+        )
+    # Set by forms.ImageField, which has opened the upload already.
+    width, height = image.image.size
+    if max(width, height) > settings.POST_IMAGE_MAX_SIDE:
+        raise ValidationError(
+            'The image must not be wider or higher than %(limit)s pixels.',
+            code='image_too_wide',
+            params={'limit': settings.POST_IMAGE_MAX_SIDE},
+        )
+
+
+def stem(name):
+    """The file name without its directory and extension."""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def variant_name(name, width):
+    extension = EXTENSIONS.get(
+        settings.POST_IMAGE_FORMAT, settings.POST_IMAGE_FORMAT.lower()
+    )
+    return f'{VARIANTS_DIR}/{stem(name)}-{width}.{extension}'
+
+
+def variant_url(image, width):
+    return default_storage.url(variant_name(image.name, width))
+
+
+def srcset(image, widths):
+    """The ``srcset`` attribute value of the variants of an image."""
+    return ', '.join(
+        f'{variant_url(image, width)} {width}w' for width in widths
+    )
+
+
+def _has_metadata(image):
+    return (
+        any(key in image.info for key in METADATA)
+        or bool(image.getexif())
+        # The text chunks of a PNG.
+        or bool(getattr(image, 'text', None))
+    )
+
+
+def reencode(data, quality):
+    """An encoded image in its own format with nothing but its pixels,
+    turned upright by its EXIF orientation; runs in the process pool.
+
+    Images without metadata are returned as they are.
+    """
+    with Image.open(BytesIO(data)) as source:
+        if not _has_metadata(source):
+            return data
+        image_format = source.format
+        animated = getattr(source, 'n_frames', 1) > 1
+        # Rotating only the first frame would break an animation.
+        image = source if animated else ImageOps.exif_transpose(source)
+        image.info = {
+            key: value for key, value in image.info.items()
+            if key in KEEP_INFO
+        }
+        output = BytesIO()
+        image.save(
+            output, image_format, save_all=animated, quality=quality
+        )
+    return output.getvalue()
+
+
+def encode(data, widths, image_format, quality):
+    """Variants of an encoded image, by width; runs in the process pool.
+
+    Widths over the width of the image are replaced with that width.
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert(
+            'RGBA' if 'A' in image.getbands()
+            or 'transparency' in image.info else 'RGB'
+        )
+    width, height = image.size
+    variants = {}
+    for target in sorted({min(target, width) for target in widths}):
+        resized = image
+        if target != width:
+            resized = image.resize(
+                (target, max(1, round(height * target / width))),
+                Image.LANCZOS,
+            )
+        output = BytesIO()
+        # Nothing passes exif or icc_profile on, so neither is written.
+        resized.save(output, image_format, quality=quality)
+        variants[target] = output.getvalue()
+    return variants
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.POST_IMAGE_PROCESSES
+        )
+    return _pool
+
+
+def _run(func, *args):
+    """Call ``func`` in the process pool, which is replaced when one of
+    its processes died, e.g. killed for running out of memory.
+    """
+    global _pool
+    try:
+        return _get_pool().submit(func, *args).result()
+    except BrokenProcessPool:
+        _pool = None
+        raise
+
+
+def _strip(post):
+    """Move the posts using the stored image of ``post`` to a copy
+    without metadata; return the name of the image to use.
+    """
+    from .models import Post
+
+    name = post.image.name
+    with post.image.storage.open(name) as source:
+        data = source.read()
+    stripped = _run(reencode, data, settings.POST_IMAGE_QUALITY)
+    if stripped == data:
+        return name
+    new = post.image.storage.save(name, ContentFile(stripped))
+    with transaction.atomic():
+        posts = list(Post.objects.filter(image=name).select_related(
+            'author', 'group'
+        ))
+        storage.replace(name, new)
+    caching.bump(*{
+        scope for moved in posts for scope in caching.post_scopes(moved)
+    })
+    thumbnails.schedule(new)
+    return new
+
+
+def _store_variants(image):
+    with image.storage.open(image.name) as source:
+        data = source.read()
+    variants = _run(
+        encode,
+        data,
+        settings.POST_IMAGE_WIDTHS,
+        settings.POST_IMAGE_FORMAT,
+        settings.POST_IMAGE_QUALITY,
+    )
+    for width, content in variants.items():
+        name = variant_name(image.name, width)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(content))
+    return list(variants)
+
+
+@task
+def process(post_id):
+    """Strip the metadata of the image of a post, then store its
+    variants and list them on it.
+    """
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id).select_related(
+        'author', 'group'
+    ).first()
+    if post is None or not post.image:
+        return
+    try:
+        post.image.name = name = _strip(post)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # Retrying would not help; the image keeps its metadata.
+        logger.exception('Cannot strip the metadata of %s', post.image)
+        return
+    # Posts with the same stored image share its variants.
+    widths = Post.objects.filter(image=name).exclude(
+        image_widths=''
+    ).values_list('image_widths', flat=True).first()
+    if widths is None:
+        widths = ','.join(map(str, _store_variants(post.image)))
+    # The image may have been replaced in the meantime.
+    updated = Post.objects.filter(pk=post_id, image=name).update(
+        image_widths=widths,
+        image_stem=stem(name),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        caching.bump(*caching.post_scopes(post))
+
+
+def schedule(post_id):
+    """Process the image of a post once the current transaction commits."""
+    if not settings.TASKS_EAGER:
+        process.delay(post_id)
+        return
+    thumbnails.in_background(process, post_id)
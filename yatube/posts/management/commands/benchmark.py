@@ -0,0 +1,92 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.models import AuthorStats
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency and queries of the post views, or compare two '
+        'saved runs with --compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--user',
+            help='Username to log in as; defaults to the user who follows '
+                 'the most authors.',
+        )
+        parser.add_argument('--anonymous', action='store_true')
+        parser.add_argument('--save', help='Write the results to a file.')
+        parser.add_argument(
+            '--baseline',
+            help='Compare this run with the results saved in a file.',
+        )
+        parser.add_argument(
+            '--compare',
+            nargs=2,
+            metavar=('BASELINE', 'RESULTS'),
+            help='Compare two saved runs without running the benchmark.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.1,
+            help='Tolerated p95 latency growth, 0.1 is 10%%.',
+        )
+
+    def load(self, path):
+        with open(path) as file:
+            return json.load(file)
+
+    def get_user(self, options):
+        if options['anonymous']:
+            return None
+        if options['user']:
+            try:
+                return User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user {options["user"]}')
+        stats = AuthorStats.objects.select_related('user').order_by(
+            '-following_count'
+        ).first()
+        if stats is None:
+            raise CommandError('No users, run seed_benchmark first')
+        return stats.user
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            baseline, results = map(self.load, options['compare'])
+        else:
+            baseline = options['baseline'] and self.load(options['baseline'])
+            results = benchmark.run(
+                options['requests'],
+                warmup=options['warmup'],
+                user=self.get_user(options),
+                seed=options['seed'],
+                stdout=self.stdout,
+            )
+            if options['save']:
+                with open(options['save'], 'w') as file:
+                    json.dump(results, file, indent=2)
+        for line in benchmark.report(results):
+            self.stdout.write(line)
+        if not baseline:
+            return
+        regressions = benchmark.compare(
+            baseline, results, options['threshold']
+        )
+        if regressions:
+            raise CommandError(
+                'Regressions:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions'))
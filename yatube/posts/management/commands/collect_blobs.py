@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts import storage
+
+
+class Command(BaseCommand):
+    help = 'Delete stored post images that no post uses any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.BLOB_GC_GRACE,
+            help='Seconds a file must have been unused; defaults to '
+                 'BLOB_GC_GRACE.',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute the reference counts from the posts first.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            storage.recount()
+        files, size = storage.collect(options['grace'], options['dry_run'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {files} files ({filesizeformat(size)})'
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts import cleanup
+
+
+class Command(BaseCommand):
+    help = (
+        'Report, or delete with --delete, the post images, variants and '
+        'thumbnails that nothing uses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true')
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.MEDIA_GC_GRACE,
+            help='Skip files modified within this many seconds; defaults '
+                 'to MEDIA_GC_GRACE.',
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            help='Keep running, collecting every this many seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            report = cleanup.collect(options['grace'], options['delete'])
+            self.stdout.write(self.style.SUCCESS(
+                report.summary(options['delete'])
+            ))
+            if not options['every']:
+                return
+            close_old_connections()
+            time.sleep(options['every'])
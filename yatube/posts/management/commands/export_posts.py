@@ -0,0 +1,36 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+def open_file(path, mode):
+    if path == '-':
+        return None
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Command(BaseCommand):
+    help = 'Stream groups, posts, comments and follows out as NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Output file, gzipped when it ends with .gz; '
+                 'standard output by default.',
+        )
+
+    def handle(self, *args, **options):
+        output = open_file(options['path'], 'w')
+        try:
+            rows = transfer.export(output or sys.stdout, self.stderr)
+        finally:
+            if output is not None:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f'Exported {rows} rows'))
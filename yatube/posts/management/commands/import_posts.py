@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+from .export_posts import open_file
+
+
+class Command(BaseCommand):
+    help = 'Load NDJSON written by export_posts in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Input file, gzipped when it ends with .gz; '
+                 'standard input by default.',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_false',
+            dest='rebuild',
+            help='Do not recount counters and rebuild timelines and '
+                 'the search index afterwards.',
+        )
+
+    def handle(self, *args, **options):
+        lines = open_file(options['path'], 'r')
+        try:
+            rows = transfer.load(
+                lines or sys.stdin, self.stdout, rebuild=options['rebuild']
+            )
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Invalid input: {error}')
+        finally:
+            if lines is not None:
+                lines.close()
+        self.stdout.write(self.style.SUCCESS(f'Imported {rows} rows'))
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.utils import pk_batches
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized follow timelines from the Follow graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Only rebuild the timelines of these users.',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        rebuilt = 0
+        for batch in pk_batches(users):
+            for user_id in batch:
+                with transaction.atomic():
+                    timeline.rebuild(user_id)
+            rebuilt += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} timelines'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters, storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the denormalized post, follower and comment counters '
+        'and the reference counts of stored images.'
+    )
+
+    def handle(self, *args, **options):
+        authors = counters.recount_authors()
+        posts = counters.recount_comments()
+        blobs = storage.recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted {authors} authors, {posts} posts and {blobs} images'
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def recount(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post = apps.get_model('posts', 'Post')
+    users = User.objects.annotate(
+        posts_total=models.Count('posts', distinct=True),
+        followers_total=models.Count('following', distinct=True),
+        following_total=models.Count('follower', distinct=True),
+    )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(
+            user_id=user.pk,
+            post_count=user.posts_total,
+            follower_count=user.followers_total,
+            following_count=user.following_total,
+        )
+        for user in users
+    )
+    for post in Post.objects.annotate(total=models.Count('comments')):
+        Post.objects.filter(pk=post.pk).update(comment_count=post.total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Author')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Number of posts')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='Number of followers')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Number of subscriptions')),
+            ],
+            options={
+                'verbose_name': 'Author statistics',
+                'verbose_name_plural': 'Author statistics',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of comments'),
+        ),
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
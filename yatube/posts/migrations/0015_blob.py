@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:46
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_widths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='File name')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Size in bytes')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Number of posts using the file')),
+                ('touched_at', models.DateTimeField(auto_now=True, verbose_name='Last stored or referenced')),
+            ],
+            options={
+                'verbose_name': 'Stored file',
+                'verbose_name_plural': 'Stored files',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Image'),
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['ref_count', 'touched_at'], name='blob_orphan_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:24
+
+import os
+
+from django.db import migrations, models
+
+
+def fill_stems(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    processed = Post.objects.exclude(image_widths='').exclude(image='')
+    for pk, image in list(processed.values_list('pk', 'image')):
+        stem = os.path.splitext(os.path.basename(image))[0]
+        Post.objects.filter(pk=pk).update(image_stem=stem)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_stem',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, verbose_name='Stem of the processed image'),
+        ),
+        migrations.RunPython(fill_stems, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from . import images
+from .storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
@@ -44,21 +47,75 @@ class Post(models.Model):
     image = models.ImageField(
         'Image',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
     pub_date = models.DateTimeField(
         'Date of publication',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Date of the last change',
+        auto_now=True
+    )
+    image_widths = models.CharField(
+        'Widths of the processed image',
+        max_length=100,
+        blank=True,
+        editable=False
+    )
+    image_stem = models.CharField(
+        'Stem of the processed image',
+        max_length=100,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    comment_count = models.PositiveIntegerField(
+        'Number of comments',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def image_srcset(self):
+        """``srcset`` of the processed image, empty until it is ready."""
+        if not self.image or not self.image_widths:
+            return ''
+        return images.srcset(self.image, self.image_widths.split(','))
+
+    @property
+    def image_src(self):
+        """URL of the widest processed variant, or of the stored image
+        until the variants are ready.
+        """
+        if not self.image or not self.image_widths:
+            return self.image.url if self.image else ''
+        widest = self.image_widths.split(',')[-1]
+        return images.variant_url(self.image, widest)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -83,6 +140,12 @@ class Comment(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
+        indexes = (
+            models.Index(
+                fields=('post', '-pub_date', '-id'),
+                name='comment_post_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -102,3 +165,97 @@ class Follow(models.Model):
 
         verbose_name = 'Subscription'
         verbose_name_plural = 'Subscriptions'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+        )
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Author'
+    )
+    post_count = models.PositiveIntegerField('Number of posts', default=0)
+    follower_count = models.PositiveIntegerField(
+        'Number of followers',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Number of subscriptions',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Author statistics'
+        verbose_name_plural = 'Author statistics'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Reader'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Post'
+    )
+    pub_date = models.DateTimeField('Date of publication')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Timeline entry'
+        verbose_name_plural = 'Timeline entries'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_feed_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} <- {self.post_id}'
+
+
+class Blob(models.Model):
+    name = models.CharField('File name', max_length=100, unique=True)
+    size = models.PositiveIntegerField('Size in bytes', default=0)
+    ref_count = models.PositiveIntegerField(
+        'Number of posts using the file',
+        default=0
+    )
+    touched_at = models.DateTimeField(
+        'Last stored or referenced',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Stored file'
+        verbose_name_plural = 'Stored files'
+        indexes = (
+            models.Index(
+                fields=('ref_count', 'touched_at'),
+                name='blob_orphan_idx',
+            ),
+        )
+
+    def __str__(self):
+        return self.name
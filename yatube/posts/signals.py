@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    caching, counters, images, storage, tasks, thumbnails, timeline,
+)
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .utils import chunks
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_group_slug, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group__slug', 'image')
+            .first()
+        ) or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_author(instance.author_id, post_count=1)
+        tasks.fan_out.delay(instance.pk)
+    previous_image = getattr(instance, '_previous_image', None)
+    if instance.image.name != previous_image:
+        if previous_image:
+            storage.release(previous_image)
+        if instance.image_widths:
+            # The variants of the previous image do not fit the new one.
+            instance.image_widths = instance.image_stem = ''
+            Post.objects.filter(pk=instance.pk).update(
+                image_widths='', image_stem=''
+            )
+        if instance.image:
+            storage.retain(instance.image.name)
+        thumbnails.schedule(instance.image.name)
+        if instance.image:
+            images.schedule(instance.pk)
+    caching.bump(*caching.post_scopes(
+        instance, getattr(instance, '_previous_group_slug', None)
+    ))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if instance.image:
+        storage.release(instance.image.name)
+    counters.bump_author(instance.author_id, post_count=-1)
+    caching.bump(*caching.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_comments(instance.post_id, 1)
+        caching.bump(caching.post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    caching.bump(caching.post_scope(instance.post_id))
+
+
+def group_scopes(group):
+    """Scopes of the pages showing the title of a group: the index, the
+    group, and the pages and profiles of its posts.
+    """
+    scopes = {caching.INDEX, caching.group_scope(group.slug)}
+    rows = Post.objects.filter(group=group).values_list(
+        'pk', 'author__username'
+    )
+    for pk, username in rows.iterator():
+        scopes.add(caching.post_scope(pk))
+        scopes.add(caching.author_scope(username))
+    return scopes
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # The posts lose their group before post_delete.
+    instance._scopes = group_scopes(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = getattr(instance, '_scopes', None) or group_scopes(instance)
+    for batch in chunks(scopes):
+        caching.bump(*batch)
+
+
+def bump_profiles(follow):
+    caching.bump(
+        caching.author_scope(follow.user.username),
+        caching.author_scope(follow.author.username),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_author(instance.author_id, follower_count=1)
+        counters.bump_author(instance.user_id, following_count=1)
+        tasks.backfill.delay(instance.user_id, instance.author_id)
+        bump_profiles(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, follower_count=-1)
+    counters.bump_author(instance.user_id, following_count=-1)
+    timeline.remove(instance.user_id, instance.author_id)
+    if timeline.at_limit(instance.author_id):
+        # Back under the fan-out limit; the timelines lack the posts
+        # that were read on demand until now.
+        tasks.refill.delay(instance.author_id)
+    bump_profiles(instance)
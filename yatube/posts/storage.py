@@ -0,0 +1,137 @@
+"""Content-addressed storage of post images.
+
+Uploads are stored once per distinct content, as
+``<upload_to>/<aa>/<sha256>.<ext>``: uploading the same bytes again
+reuses the stored file instead of adding a copy with a random suffix,
+and the thumbnails and variants named after it are shared as well.
+
+Every stored file has a ``Blob`` row counting the posts that use it.
+The post signals keep the counts (``retain`` and ``release``), and
+``replace`` moves them along with the posts to another file;
+``recount`` rebuilds them after bulk changes that send no signals, and
+``collect`` deletes the files no post has used for ``grace`` seconds.
+A blob that is stored or referenced again is touched, so the collector
+leaves alone what an upload in progress is about to use.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        from .models import Blob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        blob, created = Blob.objects.get_or_create(
+            name=name, defaults={'size': content.size}
+        )
+        if not created:
+            Blob.objects.filter(pk=blob.pk).update(touched_at=timezone.now())
+        if not self.exists(name):
+            name = self._save(name, content)
+        return name
+
+
+def retain(name):
+    """Count one more post using a stored file."""
+    from .models import Blob
+
+    Blob.objects.filter(name=name).update(
+        ref_count=F('ref_count') + 1, touched_at=timezone.now()
+    )
+
+
+def release(name):
+    """Count one post less using a stored file."""
+    from .models import Blob
+
+    Blob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, touched_at=timezone.now()
+    )
+
+
+def replace(old, new):
+    """Point the posts using one stored file at another, with their
+    references; return how many posts were changed.
+
+    Their variants were made from the old file, so they are dropped.
+    """
+    from .models import Blob, Post
+
+    now = timezone.now()
+    with transaction.atomic():
+        moved = Post.objects.filter(image=old).update(
+            image=new, image_widths='', image_stem=''
+        )
+        if moved:
+            Blob.objects.filter(name=new).update(
+                ref_count=F('ref_count') + moved, touched_at=now
+            )
+            Blob.objects.filter(name=old).update(
+                ref_count=Greatest(F('ref_count') - moved, 0),
+                touched_at=now,
+            )
+    return moved
+
+
+def recount():
+    """Recompute the reference counts from the posts in one query."""
+    from .models import Blob, Post
+
+    uses = Post.objects.filter(image=OuterRef('name')).order_by().values(
+        'image'
+    ).annotate(count=Count('pk')).values('count')
+    return Blob.objects.update(ref_count=Coalesce(Subquery(uses), 0))
+
+
+def collect(grace, dry_run=False):
+    """Delete the files unused for ``grace`` seconds.
+
+    Return how many files were (or, with ``dry_run``, would be) deleted
+    and their size in bytes.
+    """
+    from .models import Blob, Post
+
+    storage = Post._meta.get_field('image').storage
+    orphans = Blob.objects.filter(
+        ref_count=0,
+        touched_at__lt=timezone.now() - timedelta(seconds=grace),
+    )
+    files = size = 0
+    for blob in orphans.iterator():
+        if not dry_run:
+            # Unless a post started using it since the SELECT.
+            deleted, _ = Blob.objects.filter(
+                pk=blob.pk, ref_count=0, touched_at=blob.touched_at
+            ).delete()
+            if not deleted:
+                continue
+            storage.delete(blob.name)
+        files += 1
+        size += blob.size
+    return files, size
@@ -0,0 +1,28 @@
+"""Post side effects that can run outside the request."""
+from tasks.queue import task
+
+from . import counters, timeline
+from .models import Post
+
+
+@task
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task
+def backfill(user_id, author_id):
+    timeline.backfill(user_id, author_id)
+
+
+@task
+def refill(author_id):
+    timeline.refill(author_id)
+
+
+@task(batch=True)
+def recount_authors(calls):
+    """Recount the authors of all queued calls together."""
+    counters.recount_authors(sorted({user_id for user_id, in calls}))
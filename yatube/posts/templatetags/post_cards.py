@@ -0,0 +1,62 @@
+"""Rendered post cards, cached per post version.
+
+``{% post_cards page_obj as cards %}`` looks the cards of a whole page
+up with one ``cache.get_many`` and renders only the missing ones. A card's key
+names the post and its ``updated_at``, plus what the card shows that
+changes without saving the post (the thumbnail, the author's names, the
+group) and the variant of the page: profile pages leave out the author
+link, group pages the group. The same card is thus shared by every feed
+that shows that variant.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+
+register = template.Library()
+
+CARD_KEY = 'post-card:{}'
+
+
+def card_key(post, profile, group):
+    parts = [
+        post.pk,
+        post.updated_at.isoformat(),
+        post.image.name,
+        getattr(post, 'thumbnail', None),
+        profile,
+        group,
+    ]
+    if profile:
+        parts += [post.author.first_name, post.author.last_name]
+    else:
+        parts.append(post.author.username)
+    if not group and post.group_id:
+        parts += [post.group.slug, post.group.title]
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return CARD_KEY.format(digest)
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """The rendered cards of ``posts``, in order."""
+    posts = list(posts)
+    profile, group = bool(context.get('profile')), bool(context.get('group'))
+    keys = [card_key(post, profile, group) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    card_template = get_template('posts/includes/post_card.html')
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            missing[key] = cards[key] = card_template.render({
+                'post': post,
+                'profile': profile,
+                'group': group,
+            })
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
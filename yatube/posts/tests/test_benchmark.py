@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark',
+            users=30, posts=120, groups=3, follows=4, comments=40, seed=7,
+            stdout=StringIO(),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_seed(self):
+        """The data set is complete and its derived tables are built."""
+        self.assertEqual(
+            User.objects.filter(username__startswith='bench-7-').count(), 30
+        )
+        self.assertEqual(Post.objects.count(), 120)
+        dates = Post.objects.order_by('pk').values_list('pub_date', flat=True)
+        self.assertGreater(dates.last() - dates.first(), timedelta(days=300))
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('post_count', flat=True)),
+            120,
+        )
+
+    def test_run_and_compare(self):
+        """Runs are saved and compared, regressions fail the command."""
+        path = os.path.join(self.directory.name, 'run.json')
+        out = StringIO()
+        call_command(
+            'benchmark', requests=3, warmup=1, save=path, stdout=out
+        )
+        with open(path) as file:
+            results = json.load(file)
+        self.assertEqual(set(results), set(benchmark.VIEWS))
+        self.assertIn('p99 ms', out.getvalue())
+
+        slower = json.loads(json.dumps(results))
+        slower['posts:index']['total_time']['p95'] *= 2
+        slower['posts:index']['total_time']['p95'] += 1
+        slower['posts:profile']['queries']['max'] += 1
+        slower_path = os.path.join(self.directory.name, 'slower.json')
+        with open(slower_path, 'w') as file:
+            json.dump(slower, file)
+        call_command('benchmark', compare=[path, path], stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'posts:profile: queries'):
+            call_command(
+                'benchmark', compare=[path, slower_path], stdout=StringIO()
+            )
+        self.assertEqual(len(benchmark.compare(results, slower, 0.1)), 2)
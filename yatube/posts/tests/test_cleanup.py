@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts import cleanup, images
+from posts.models import Blob, Post
+
+User = get_user_model()
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CollectMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Kept',
+            image=SimpleUploadedFile('kept.gif', b'kept', 'image/gif'),
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            image_widths='480', image_stem=images.stem(self.post.image.name)
+        )
+        self.used = [
+            self.post.image.name,
+            self.save(images.variant_name(self.post.image.name, 480)),
+            self.thumbnail('cache/aa/bb/kept.jpg', self.post.image.name),
+        ]
+        self.orphans = [
+            self.save('posts/gone.gif'),
+            self.save(images.variant_name('posts/gone.gif', 480)),
+            self.thumbnail('cache/cc/dd/gone.jpg', 'posts/gone.gif'),
+            self.save('cache/ee/ff/unknown.jpg'),
+        ]
+
+    def save(self, name):
+        return default_storage.save(name, ContentFile(b'orphan'))
+
+    def thumbnail(self, name, source_name):
+        thumbnail = ImageFile(self.save(name), default.storage)
+        source = ImageFile(source_name, Post.image.field.storage)
+        for image in (thumbnail, source):
+            image.set_size((2, 1))
+        default.kvstore.set(source)
+        default.kvstore.set(thumbnail, source)
+        return thumbnail.name
+
+    def age(self, seconds):
+        then = time.time() - seconds
+        for directory, _, files in os.walk(TEMP_MEDIA_ROOT):
+            for name in files:
+                os.utime(os.path.join(directory, name), (then, then))
+
+    def existing(self, names):
+        return [name for name in names if default_storage.exists(name)]
+
+    def test_orphans_are_reported_without_deleting(self):
+        self.age(3600)
+        report = cleanup.collect(grace=60)
+        self.assertEqual(report.orphans, 4)
+        self.assertEqual(report.size, len(b'orphan') * 4)
+        self.assertEqual(report.files, 7)
+        self.assertEqual(self.existing(self.orphans), self.orphans)
+
+    def test_orphans_are_deleted(self):
+        self.age(3600)
+        output = StringIO()
+        call_command('collect_media', '--delete', '--grace=60', stdout=output)
+        self.assertIn('4 orphans, 24\xa0bytes reclaimed', output.getvalue())
+        self.assertEqual(self.existing(self.orphans), [])
+        self.assertEqual(self.existing(self.used), self.used)
+        gone = ImageFile('posts/gone.gif', Post.image.field.storage)
+        self.assertIsNone(default.kvstore.get(gone))
+
+    def test_recent_files_are_kept(self):
+        report = cleanup.collect(grace=60, delete=True)
+        # Only the thumbnail of the deleted source goes with its entry.
+        self.assertEqual(report.orphans, 1)
+        gone_thumbnail = self.orphans[2]
+        self.assertEqual(
+            self.existing(self.orphans),
+            [name for name in self.orphans if name != gone_thumbnail],
+        )
+
+    def test_unused_blobs_wait_for_their_own_grace(self):
+        name = self.post.image.name
+        self.post.delete()
+        self.age(3600)
+        report = cleanup.collect(grace=60, delete=True)
+        self.assertTrue(default_storage.exists(name))
+        # The orphans, and the variant and thumbnail of the image.
+        self.assertEqual(report.orphans, 6)
+        Blob.objects.filter(name=name).update(
+            touched_at=timezone.now() - timedelta(days=2)
+        )
+        report = cleanup.collect(grace=60, delete=True)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+        self.assertEqual(report.orphans, 1)
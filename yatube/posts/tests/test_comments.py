@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Post
+from posts.utils import update_by_pk
+
+User = get_user_model()
+
+
+class CommentPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Viral post')
+        now = timezone.now()
+        cls.total = settings.COMMENTS_PER_PAGE * 2 + 5
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Comment {number}')
+            for number in range(cls.total)
+        )
+        ids = Comment.objects.order_by('pk').values_list('pk', flat=True)
+        # Pairs of comments share a date to exercise the id tie-breaker.
+        update_by_pk(Comment.objects, 'pub_date', (
+            (pk, now + timedelta(seconds=number // 2))
+            for number, pk in enumerate(list(ids))
+        ))
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def fragment(self, cursor):
+        return Client().get(
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            {'cursor': cursor},
+        )
+
+    def test_first_render_is_capped(self):
+        """The post page shows only the newest comments."""
+        response = Client().get(self.url)
+        comments = response.context['comment_list']
+        self.assertEqual(len(comments), settings.COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, f'Comment {self.total - 1}')
+        self.assertContains(response, 'Older comments')
+
+    def test_cursor_pages_cover_all_comments_once(self):
+        """Following the cursors reaches every comment exactly once."""
+        page = Client().get(self.url).context['comment_page']
+        seen = [comment.pk for comment in page.object_list]
+        while page.next_cursor:
+            response = self.fragment(page.next_cursor)
+            page = response.context['comment_page']
+            seen += [comment.pk for comment in page.object_list]
+        self.assertNotContains(response, 'Older comments')
+        self.assertEqual(
+            seen,
+            list(Comment.objects.order_by(
+                '-pub_date', '-id'
+            ).values_list('pk', flat=True)),
+        )
+
+    def test_older_comments_without_javascript(self):
+        """The link also works as a plain page with older comments."""
+        cursor = Client().get(self.url).context['comment_page'].next_cursor
+        response = Client().get(self.url, {'comments': cursor})
+        self.assertEqual(
+            response.context['comment_list'][0].text,
+            f'Comment {self.total - 1 - settings.COMMENTS_PER_PAGE}',
+        )
+
+    def test_comments_are_read_with_one_sliced_query(self):
+        """The first render reads one page of comments with their
+        authors, whatever the number of comments.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            Client().get(self.url)
+        comment_queries = [
+            query['sql'] for query in queries
+            if 'FROM "posts_comment"' in query['sql']
+        ]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn(
+            f'LIMIT {settings.COMMENTS_PER_PAGE + 1}', comment_queries[0]
+        )
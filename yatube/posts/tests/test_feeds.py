@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_group',
+            description='Test description',
+        )
+        cls.group_post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Group post'
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.other, text='Other post'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_list_their_posts(self):
+        """Each feed lists the posts of its timeline."""
+        feeds = {
+            'posts:index_rss': ((), (self.group_post, self.other_post)),
+            'posts:index_atom': ((), (self.group_post, self.other_post)),
+            'posts:group_rss': ((self.group.slug,), (self.group_post,)),
+            'posts:group_atom': ((self.group.slug,), (self.group_post,)),
+            'posts:profile_rss': (('other',), (self.other_post,)),
+            'posts:profile_atom': (('other',), (self.other_post,)),
+        }
+        for name, (args, posts) in feeds.items():
+            with self.subTest(name=name):
+                response = Client().get(reverse(name, args=args))
+                kind = 'atom' if name.endswith('atom') else 'rss'
+                self.assertIn(kind, response['Content-Type'])
+                for post in Post.objects.all():
+                    link = reverse('posts:post_detail', args=(post.pk,))
+                    if post in posts:
+                        self.assertContains(response, link)
+                    else:
+                        self.assertNotContains(response, link)
+        response = Client().get(reverse('posts:group_rss', args=('none',)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_is_cached_until_a_new_post(self):
+        url = reverse('posts:index_rss')
+        first = Client().get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(Client().get(url).content, first.content)
+        reader = Client()
+        reader.force_login(self.other)
+        response = reader.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(author=self.author, text='Fresh post')
+        response = Client().get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Fresh post')
+
+    def test_feed_is_cached_per_host(self):
+        url = reverse('posts:index_rss')
+        link = reverse('posts:post_detail', args=(self.group_post.pk,))
+        self.assertContains(Client().get(url), f'http://testserver{link}')
+        response = Client().get(url, HTTP_HOST='localhost', secure=True)
+        self.assertContains(response, f'https://localhost{link}')
+        self.assertNotContains(response, 'testserver')
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -76,11 +77,13 @@ class TestCreateFormTests(TestCase):
             reverse('posts:profile', args=(self.user.username,))
         )
         self.assertEqual(Post.objects.count(), post_count + 1)
+        digest = hashlib.sha256(small_gif).hexdigest()
+        image = f'posts/{digest[:2]}/{digest}.gif'
         self.assertTrue(
             Post.objects.filter(
                 text='Test post 2',
                 group=self.group,
-                image='posts/small.gif'
+                image=image
             ).exists()
         )
 
@@ -92,7 +95,7 @@ class TestCreateFormTests(TestCase):
         self.assertEqual(post_text_0, form_data['text'])
         self.assertEqual(post_group_0, self.group)
         self.assertEqual(post_author_0, self.user)
-        self.assertEqual(post_image_0, 'posts/small.gif')
+        self.assertEqual(post_image_0, image)
 
     def test_form_edit(self):
         """A valid form edits post in Post.
@@ -0,0 +1,150 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images
+from posts.forms import PostForm
+from posts.models import Blob, Post
+from tasks import queue
+
+User = get_user_model()
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(width, height):
+    """A JPEG with a camera model and a GPS position in its EXIF data."""
+    exif = Image.Exif()
+    exif[0x0110] = 'Camera'
+    exif[0x8825] = {1: 'N', 2: (55.0, 45.0, 0.0)}
+    output = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(
+        output, 'JPEG', exif=exif
+    )
+    return output.getvalue()
+
+
+class EncodeTests(TestCase):
+    def test_variants_are_resized_without_metadata(self):
+        variants = images.encode(jpeg(1000, 500), (480, 960, 1440), 'WEBP', 80)
+        self.assertEqual(list(variants), [480, 960, 1000])
+        for width, data in variants.items():
+            with Image.open(BytesIO(data)) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.size, (width, width // 2))
+                self.assertNotIn('exif', image.info)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def form(self, width=20, height=10):
+        return PostForm(
+            data={'text': 'Photo'},
+            files={'image': SimpleUploadedFile(
+                'photo.jpg', jpeg(width, height), 'image/jpeg'
+            )},
+        )
+
+    def test_limits_are_checked_before_saving(self):
+        self.assertTrue(self.form().is_valid())
+        with self.settings(POST_IMAGE_MAX_BYTES=100):
+            self.assertEqual(
+                self.form().errors['image'][0],
+                'The image must not be larger than 100\xa0bytes.',
+            )
+        with self.settings(POST_IMAGE_MAX_SIDE=15):
+            self.assertIn('image', self.form().errors)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_worker_strips_the_metadata(self):
+        form = self.form()
+        self.assertTrue(form.is_valid())
+        form.instance.author = self.user
+        post = form.save()
+        original = post.image.name
+        with Image.open(post.image) as image:
+            self.assertIn('exif', image.info)
+        self.assertContains(
+            Client().get(reverse('posts:post_detail', args=(post.pk,))),
+            f'src="{post.image.url}"',
+        )
+        queue.work(once=True)
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, original)
+        with Image.open(post.image) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (20, 10))
+            self.assertNotIn('exif', image.info)
+        self.assertEqual(
+            dict(Blob.objects.values_list('name', 'ref_count')),
+            {original: 0, post.image.name: 1},
+        )
+        response = Client().get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertNotContains(response, original)
+        self.assertContains(response, post.image_src)
+
+    @override_settings(TASKS_EAGER=False, POST_IMAGE_WIDTHS=(8, 16, 32))
+    def test_worker_stores_variants_for_srcset(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Photo',
+            image=SimpleUploadedFile(
+                'photo.jpg', jpeg(20, 10), 'image/jpeg'
+            ),
+        )
+        self.assertEqual(post.image_srcset, '')
+        queue.work(once=True)
+        post.refresh_from_db()
+        self.assertEqual(post.image_widths, '8,16,20')
+        self.assertEqual(post.image_stem, images.stem(post.image.name))
+        for width in (8, 16, 20):
+            name = images.variant_name(post.image.name, width)
+            self.assertTrue(post.image.storage.exists(name))
+            self.assertIn(f'/media/{name} {width}w', post.image_srcset)
+        response = Client().get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, f'srcset="{post.image_srcset}"')
+        self.assertContains(
+            response, f'src="{images.variant_url(post.image, 20)}"'
+        )
+
+    def test_new_image_drops_the_variants(self):
+        post = Post.objects.create(
+            author=self.user, text='Photo', image='posts/old.jpg'
+        )
+        Post.objects.filter(pk=post.pk).update(
+            image_widths='480', image_stem='old'
+        )
+        post.refresh_from_db()
+        post.text = 'Edited'
+        post.save()
+        self.assertEqual(post.image_widths, '480')
+        post.image = 'posts/new.jpg'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.image_widths, post.image_stem), ('', ''))
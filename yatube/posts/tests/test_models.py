@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -84,3 +87,45 @@ class PostModelTest(TestCase):
             help_text,
             'Сообщество, к которому будет относиться пост'
         )
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_writes(self):
+        """Creating and deleting posts, comments and subscriptions
+        keeps the counters up to date.
+        """
+
+        post = Post.objects.create(author=self.author, text='Counted')
+        Comment.objects.create(post=post, author=self.reader, text='Hi')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.author.stats.refresh_from_db()
+        self.reader.stats.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.author.stats.post_count, 1)
+        self.assertEqual(self.author.stats.follower_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.assertEqual(post.comment_count, 1)
+
+        follow.delete()
+        post.delete()
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.post_count, 0)
+        self.assertEqual(self.author.stats.follower_count, 0)
+
+    def test_recount_fixes_drift(self):
+        """The recount command restores counters that drifted."""
+
+        post = Post.objects.create(author=self.author, text='Counted')
+        Comment.objects.create(post=post, author=self.reader, text='Hi')
+        AuthorStats.objects.update(post_count=42)
+        Post.objects.update(comment_count=42)
+        call_command('recount', stdout=StringIO())
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).comment_count, 1)
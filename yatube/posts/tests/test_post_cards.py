@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from posts.models import Group, Post
+from posts.templatetags import post_cards
+
+User = get_user_model()
+
+PAGE = Template(
+    '{% load post_cards %}{% post_cards posts as cards %}'
+    '{% for card in cards %}{{ card }}{% endfor %}'
+)
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Group', slug='group')
+        for number in range(3):
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Post {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, **context):
+        """Render the page; return its HTML and the posts rendered anew."""
+        rendered = []
+        real = post_cards.get_template
+
+        def get_template(name):
+            card = real(name)
+            render = card.render
+
+            def counted(context=None, request=None):
+                rendered.append(context['post'].text)
+                return render(context, request)
+            card.render = counted
+            return card
+        posts = list(Post.objects.select_related('author', 'group'))
+        with mock.patch.object(post_cards, 'get_template', get_template):
+            html = PAGE.render(Context({'posts': posts, **context}))
+        return html, rendered
+
+    def test_cards_are_rendered_once(self):
+        html, rendered = self.render()
+        self.assertCountEqual(rendered, ['Post 0', 'Post 1', 'Post 2'])
+        self.assertIn('Post 1', html)
+        cached_html, rendered = self.render()
+        self.assertEqual(rendered, [])
+        self.assertEqual(cached_html, html)
+
+    def test_cards_are_looked_up_together(self):
+        self.render()
+        with mock.patch.object(
+            post_cards.cache, 'get', side_effect=AssertionError
+        ), mock.patch.object(
+            post_cards.cache, 'get_many', wraps=post_cards.cache.get_many
+        ) as get_many:
+            self.render()
+        get_many.assert_called_once()
+
+    def test_edited_post_is_rendered_again(self):
+        self.render()
+        post = Post.objects.get(text='Post 1')
+        post.text = 'Edited'
+        post.save()
+        html, rendered = self.render()
+        self.assertEqual(rendered, ['Edited'])
+        self.assertIn('Edited', html)
+
+    def test_variants_are_cached_apart(self):
+        self.render()
+        html, rendered = self.render(group=self.group)
+        self.assertEqual(len(rendered), 3)
+        self.assertNotIn('/group/group/', html)
+
+    def test_new_thumbnail_gives_a_new_card(self):
+        post = Post.objects.first()
+        post.thumbnail = None
+        key = post_cards.card_key(post, False, False)
+        post.thumbnail = '/media/cache/thumbnail.jpg'
+        self.assertNotEqual(post_cards.card_key(post, False, False), key)
@@ -0,0 +1,144 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+from ..models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='PlanAuthor')
+        cls.reader = User.objects.create_user(username='PlanReader')
+        cls.group = Group.objects.create(
+            title='Plan group',
+            slug='plan_group',
+            description='Plan description',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Plan post {number}',
+                group=cls.group,
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Hi')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def next_cursor(self, url):
+        response = self.authorized_client.get(url)
+        return url + '?cursor=' + response.context['page_obj'].next_cursor
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def test_feed_queries_use_indexes(self):
+        """No feed query scans a whole table or sorts in a temp B-tree."""
+
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+            reverse('posts:post_comments', args=(self.post.id,)),
+            reverse('posts:follow_index'),
+            self.next_cursor(reverse('posts:index')),
+            self.next_cursor(reverse('posts:follow_index')),
+        )
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are checked on SQLite only')
+        for url in urls:
+            for sql, plan in self.query_plans(url):
+                with self.subTest(url=url, sql=sql):
+                    for step in plan:
+                        self.assertNotIn('TEMP B-TREE', step)
+                        if step.startswith('SCAN'):
+                            self.assertIn('USING', step)
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='BudgetAuthor')
+        cls.reader = User.objects.create_user(
+            username='BudgetReader', is_staff=True
+        )
+        cls.group = Group.objects.create(
+            title='Budget group',
+            slug='budget_group',
+            description='Budget description',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Budget post {number}',
+                group=cls.group,
+                image=f'posts/budget_{number}.gif',
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Hi'
+            )
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_views_stay_within_budgets(self):
+        """Query budgets fail the request when a page grows an N+1."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+            reverse('posts:post_comments', args=(self.post.id,)),
+            reverse('posts:follow_index'),
+            reverse('search:search') + '?q=budget',
+        )
+        for client in (Client(), self.authorized_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    client.get(url)
+        with override_settings(QUERY_BUDGETS={'posts:index': 0}):
+            with self.assertRaises(metrics.QueryBudgetExceeded):
+                self.authorized_client.get(reverse('posts:index'))
+
+    def test_metrics_report(self):
+        """Staff see the rolling metrics of every view."""
+        self.authorized_client.get(reverse('posts:index'))
+        self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(Client().get(reverse('metrics')).status_code, 302)
+        report = self.authorized_client.get(reverse('metrics')).json()
+        index = report['posts:index']
+        self.assertEqual(index['requests'], 2)
+        self.assertGreater(index['queries']['max'], 0)
+        self.assertGreater(index['template_time']['max'], 0)
+        self.assertGreater(index['cache_hits']['max'], 0)
+        self.assertEqual(
+            set(index), {'requests', *metrics.FIELDS}
+        )
+        self.assertIn('db_pools', report)
@@ -0,0 +1,107 @@
+import hashlib
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts import storage
+from posts.models import Blob, Post
+
+User = get_user_model()
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+
+NAME = f'posts/{DIGEST[:2]}/{DIGEST}.gif'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, file_name='small.gif'):
+        return Post.objects.create(
+            author=self.user,
+            text='Image',
+            image=SimpleUploadedFile(file_name, SMALL_GIF, 'image/gif'),
+        )
+
+    def blob(self):
+        return Blob.objects.get(name=NAME)
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post()
+        second = self.create_post('copy.GIF')
+        self.assertEqual(first.image.name, NAME)
+        self.assertEqual(second.image.name, NAME)
+        self.assertEqual(first.image.read(), SMALL_GIF)
+        blob = self.blob()
+        self.assertEqual((blob.ref_count, blob.size), (2, len(SMALL_GIF)))
+
+    def test_references_follow_edits_and_deletes(self):
+        post = self.create_post()
+        post.text = 'Edited'
+        post.save()
+        self.assertEqual(self.blob().ref_count, 1)
+        post.image = ''
+        post.save()
+        self.assertEqual(self.blob().ref_count, 0)
+        post.image = NAME
+        post.save()
+        self.assertEqual(self.blob().ref_count, 1)
+        post.delete()
+        self.assertEqual(self.blob().ref_count, 0)
+
+    def test_recount_repairs_drifted_counts(self):
+        self.create_post()
+        self.create_post()
+        Blob.objects.update(ref_count=0)
+        self.assertEqual(storage.recount(), 1)
+        self.assertEqual(self.blob().ref_count, 2)
+
+    def test_unused_files_are_collected_after_grace(self):
+        post = self.create_post()
+        post.delete()
+        path = storage.ContentAddressedStorage().path(NAME)
+        self.assertEqual(storage.collect(grace=60), (0, 0))
+        Blob.objects.update(touched_at=timezone.now() - timedelta(hours=1))
+        self.create_post('used.gif')
+        self.assertEqual(storage.collect(grace=60), (0, 0))
+        Post.objects.all().delete()
+        Blob.objects.update(touched_at=timezone.now() - timedelta(hours=1))
+        output = StringIO()
+        call_command('collect_blobs', '--grace=60', '--dry-run',
+                     stdout=output)
+        self.assertIn('Would delete 1 files', output.getvalue())
+        self.assertEqual(
+            storage.collect(grace=60), (1, len(SMALL_GIF))
+        )
+        self.assertFalse(Blob.objects.exists())
+        with self.assertRaises(FileNotFoundError):
+            open(path, 'rb')
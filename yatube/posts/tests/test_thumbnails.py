@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import caching, thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Test post',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.url = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def test_new_image_schedules_thumbnails(self):
+        """Only saves that change the image schedule new thumbnails."""
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            self.post.text = 'Edited'
+            self.post.save()
+            schedule.assert_not_called()
+            # The same bytes again would be the same stored file.
+            self.post.image = SimpleUploadedFile(
+                'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+            )
+            self.post.save()
+        schedule.assert_called_once_with(self.post.image.name)
+
+    def test_page_never_resizes_inline(self):
+        """Pages show the original image until the thumbnail is ready."""
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            response = Client().get(self.url)
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, f'src="{self.post.image.url}"')
+
+    def test_generated_thumbnails_replace_cached_pages(self):
+        """Pages cached with the original image get new versions."""
+        scopes = caching.post_scopes(self.post)
+        versions = caching.feed_versions(*scopes)
+        with mock.patch('posts.thumbnails.get_thumbnail'):
+            thumbnails.generate(self.post.image.name)
+        new_versions = caching.feed_versions(*scopes)
+        for old, new in zip(versions, new_versions):
+            self.assertGreater(new, old)
+
+    def test_failed_thumbnails_leave_cached_pages(self):
+        """Nothing is bumped when sorl could not create any thumbnail."""
+        scopes = caching.post_scopes(self.post)
+        versions = caching.feed_versions(*scopes)
+        missing = mock.Mock(**{'exists.return_value': False})
+        with mock.patch(
+            'posts.thumbnails.get_thumbnail', return_value=missing
+        ):
+            thumbnails.generate(self.post.image.name)
+        self.assertEqual(caching.feed_versions(*scopes), versions)
+
+    # sorl-thumbnail 12.7 still resizes with the ANTIALIAS alias, which
+    # Pillow 10 removed.
+    @mock.patch.object(Image, 'ANTIALIAS', Image.LANCZOS, create=True)
+    def test_page_shows_generated_thumbnail(self):
+        """Once generated, the thumbnail replaces the original image."""
+        thumbnails.generate(self.post.image.name)
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            thumbnail = thumbnails.attach([self.post])[0].thumbnail
+        schedule.assert_not_called()
+        self.assertIsNotNone(thumbnail)
+        self.assertNotEqual(thumbnail, self.post.image.url)
+        self.assertContains(Client().get(self.url), f'src="{thumbnail}"')
+
+    def test_page_thumbnails_are_looked_up_together(self):
+        """A page of posts costs one cache and one store lookup."""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user,
+                text=f'Post {number}',
+                image=SimpleUploadedFile(
+                    f'{number}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            for number in range(5)
+        ]
+        with self.assertNumQueries(1):
+            thumbnails.attach(posts)
+        with self.assertNumQueries(0):
+            thumbnails.attach(posts)
+        self.assertTrue(all(post.thumbnail is None for post in posts))
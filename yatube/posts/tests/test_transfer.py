@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Group', slug='group', description='Description'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Old post'
+        )
+        Post.objects.filter(pk=cls.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Hi'
+        )
+        Comment.objects.filter(pk=cls.comment.pk).update(
+            pub_date=timezone.now() - timedelta(days=20)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'dump.ndjson.gz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_export_and_import(self):
+        """A dump loads back with remapped ids and original dates."""
+        call_command('export_posts', self.path, stderr=StringIO())
+        out = StringIO()
+        call_command('import_posts', self.path, stdout=out)
+        self.assertIn('rows/s', out.getvalue())
+
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        copy = Post.objects.exclude(pk=self.post.pk).get()
+        self.assertEqual(copy.pk, self.post.pk * 2)
+        self.assertEqual(copy.pub_date, Post.objects.get(
+            pk=self.post.pk
+        ).pub_date)
+        self.assertEqual(copy.group, self.group)
+        self.assertEqual(copy.comments.get().author, self.reader)
+        self.assertEqual(copy.comments.get().pub_date, Comment.objects.get(
+            pk=self.comment.pk
+        ).pub_date)
+        # The import leaves the model fields as they are.
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertEqual(copy.comment_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).post_count, 2
+        )
+        self.assertEqual(self.reader.timeline.count(), 2)
+
+    def test_import_creates_missing_users(self):
+        path = os.path.join(self.directory.name, 'dump.ndjson')
+        with open(path, 'w') as file:
+            for row in (
+                {'model': 'follow', 'id': 1, 'user': 'new', 'author': 'auth'},
+                {'model': 'follow', 'id': 2, 'user': 'new', 'author': 'new'},
+            ):
+                file.write(json.dumps(row) + '\n')
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertTrue(
+            Follow.objects.filter(user__username='new').exists()
+        )
+        new = User.objects.get(username='new')
+        self.assertFalse(new.has_usable_password())
+
+    def test_invalid_input(self):
+        path = os.path.join(self.directory.name, 'dump.ndjson')
+        with open(path, 'w') as file:
+            file.write(json.dumps({'model': 'user', 'id': 1}) + '\n')
+        with self.assertRaisesMessage(CommandError, 'Invalid input'):
+            call_command('import_posts', path, stdout=StringIO())
@@ -2,17 +2,20 @@ import shutil
 import tempfile
 
 from http import HTTPStatus
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, override_settings, TestCase
 from django.urls import reverse
 
 from ..forms import PostForm
-from ..models import Follow, Group, Post
+from ..models import Follow, Group, Post, TimelineEntry
+from ..utils import CursorPaginator
 
 
 User = get_user_model()
@@ -149,20 +152,91 @@ class PostPagesTests(TestCase):
         self.assertEqual(second_post, response.context['page_obj'][0])
 
     def test_cache_index(self):
-        """Testing the cache function on the main page."""
+        """The index page is served from the cache until a post changes."""
 
         response = self.client.get(reverse('posts:index'))
         content_old = response.content
+        Post.objects.filter(pk=self.post.pk).update(text='Not a write path')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.content, content_old)
         Post.objects.create(
             author=self.user,
             text='test cache',
             group=self.group,
         )
         response = self.client.get(reverse('posts:index'))
-        self.assertEqual(response.content, content_old)
-        cache.clear()
-        response = self.client.get(reverse('posts:index'))
         self.assertNotEqual(response.content, content_old)
+        self.assertContains(response, 'test cache')
+
+    def test_anonymous_page_cache(self):
+        """Anonymous visitors get cached pages, refreshed after writes;
+        authenticated users always get a rendered page.
+        """
+
+        url = reverse('posts:profile', args=(self.user,))
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Cookie', response['Vary'])
+        response = self.authorized_client.get(url)
+        self.assertIsNotNone(response.context)
+        Post.objects.create(author=self.user, text='Fresh profile post')
+        self.assertContains(self.client.get(url), 'Fresh profile post')
+
+    def test_group_changes_refresh_the_pages_showing_it(self):
+        """Renaming or deleting a group refreshes every cached page
+        showing its title.
+        """
+        group = Group.objects.create(title='Old title', slug='renamed')
+        post = Post.objects.create(
+            author=self.user, text='Grouped', group=group
+        )
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.user,)),
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        for url in urls:
+            self.assertContains(self.client.get(url), 'Old title')
+        group.title = 'New title'
+        group.save()
+        for url in urls:
+            self.assertContains(self.client.get(url), 'New title')
+        group.delete()
+        for url in urls:
+            self.assertNotContains(self.client.get(url), 'New title')
+
+    def test_conditional_get(self):
+        """Repeated requests get 304 until the page or the user changes."""
+
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(self.post.id,)),
+            {'text': 'New comment'},
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_conditional_get_follows_csrf_token(self):
+        """A new CSRF token, as after logging in, gives a new ETag."""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        etag = self.client.get(url)['ETag']
+        # The scopes of the post are looked up once for both headers.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
 
 
 class PaginatorPagesTests(TestCase):
@@ -188,6 +262,7 @@ class PaginatorPagesTests(TestCase):
         self.authorized_client2 = Client()
         self.authorized_client.force_login(self.user)
         self.authorized_client2.force_login(self.user2)
+        cache.clear()
 
     def test_paginator(self):
         """The number of posts at the first pages:
@@ -221,6 +296,82 @@ class PaginatorPagesTests(TestCase):
                             quantity
                         )
 
+    def test_paginator_cursor(self):
+        """Next and previous cursors walk the feed without offsets."""
+
+        response = self.client.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(second_page.number, 2)
+        self.assertEqual(len(second_page), settings.NUM2 - settings.NUM)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), list(first_page))
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_last_cursor_matches_the_last_numbered_page(self):
+        """The last page holds the rows left after the full pages."""
+
+        response = self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('posts:index'),
+            {'cursor': response.context['page_obj'].last_cursor},
+        )
+        last_page = response.context['page_obj']
+        self.assertEqual(last_page.number, 2)
+        self.assertEqual(len(last_page), settings.NUM2 - settings.NUM)
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': last_page.previous_cursor}
+        )
+        self.assertEqual(len(response.context['page_obj']), settings.NUM)
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_page_links_are_cursors(self):
+        """Every numbered link opens the same rows as that page number,
+        at a small query for each side with pages past the neighbours.
+        """
+
+        paginator = CursorPaginator(Post.objects.all(), 2)
+        for number in range(1, paginator.num_pages + 1):
+            page = paginator.page(number)
+            queries = (number > 3) + (number + 2 <= paginator.num_pages)
+            with self.subTest(number=number):
+                with self.assertNumQueries(queries):
+                    links = list(page.page_links)
+                self.assertEqual([n for n, cursor in links], list(range(
+                    max(1, number - 2), min(paginator.num_pages, number + 2)
+                    + 1
+                )))
+                for target, cursor in links:
+                    if cursor is None:
+                        continue
+                    self.assertEqual(
+                        list(paginator.cursor_page(cursor)),
+                        list(paginator.page(target)),
+                    )
+                    self.assertEqual(
+                        paginator.cursor_page(cursor).number, target
+                    )
+
+    @override_settings(PAGINATOR_COUNT=False)
+    def test_paginator_without_count(self):
+        """Without the total count the paginator still finds the next page.
+        """
+
+        response = self.client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertIsNone(page_obj.paginator.count)
+        self.assertTrue(page_obj.has_next())
+        self.assertEqual(list(page_obj.page_window), [1, 2])
+        response = self.client.get(reverse('posts:index') + '?page=5')
+        self.assertEqual(response.context['page_obj'].number, 1)
+
 
 class SubcribtionTests(TestCase):
     @classmethod
@@ -300,3 +451,62 @@ class SubcribtionTests(TestCase):
             reverse('posts:follow_index')
         )
         self.assertNotContains(response, post.text)
+
+    def test_new_post_fans_out_to_followers(self):
+        """A new post is written into the followers' timelines and
+        unfollowing removes it again.
+        """
+
+        Follow.objects.create(user=self.user1, author=self.user2)
+        post = Post.objects.create(author=self.user2, text='Fan out')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user1, post=post).exists()
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user3).exists()
+        )
+        self.authorized_client1.get(
+            reverse('posts:profile_unfollow', args=(self.user2,))
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Posts of authors above the fan-out limit are merged at read time.
+        """
+
+        Follow.objects.create(user=self.user1, author=self.user2)
+        post = Post.objects.create(author=self.user2, text='Celebrity post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.authorized_client1.get(reverse('posts:follow_index'))
+        self.assertContains(response, post.text)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_posts_of_former_celebrities_are_refilled(self):
+        """Falling back to the fan-out limit writes the posts read on
+        demand until then into the followers' timelines.
+        """
+
+        Follow.objects.create(user=self.user1, author=self.user2)
+        Follow.objects.create(user=self.user3, author=self.user2)
+        post = Post.objects.create(author=self.user2, text='Celebrity post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.authorized_client3.get(
+            reverse('posts:profile_unfollow', args=(self.user2,))
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user1, post=post).exists()
+        )
+        response = self.authorized_client1.get(reverse('posts:follow_index'))
+        self.assertContains(response, post.text)
+
+    def test_rebuild_timelines(self):
+        """The management command repairs drifted timelines."""
+
+        Follow.objects.create(user=self.user1, author=self.user2)
+        post = Post.objects.create(author=self.user2, text='Lost post')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user1, post=post).exists()
+        )
@@ -0,0 +1,182 @@
+"""Post image thumbnails generated off the request path.
+
+Saving a post with a new image schedules every geometry from
+``POST_THUMBNAILS`` on a small thread pool. Views only look finished
+thumbnails up, a whole page of posts at once with ``attach``, and never
+resize inline; until a thumbnail exists the original image is shown and
+the missing work is scheduled.
+
+The work is a ``generate`` job for ``run_tasks`` workers; with
+``TASKS_EAGER`` it runs on a small thread pool of the web process
+instead.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import (
+    DummyImageFile,
+    ImageFile,
+    deserialize_image_file,
+)
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from tasks.queue import task
+
+from . import caching
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+_pending = set()
+
+
+class LookupBackend(ThumbnailBackend):
+    """Finds the thumbnail sorl would create, without creating it."""
+
+    def thumbnail_file(self, file_, geometry, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry, options)
+        return ImageFile(name, default.storage)
+
+
+backend = LookupBackend()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _bump_posts(name):
+    """Move the pages showing an image to new versions."""
+    from .models import Post
+
+    posts = Post.objects.filter(image=name).select_related('author', 'group')
+    scopes = [scope for post in posts for scope in caching.post_scopes(post)]
+    if scopes:
+        caching.bump(*scopes)
+
+
+@task(unique_for=settings.THUMBNAIL_JOB_UNIQUE_FOR)
+def generate(name):
+    """Create all configured thumbnails of an image.
+
+    Unless every thumbnail failed, the pages showing the image are then
+    bumped, so that cached copies with the original image in place of a
+    thumbnail are replaced.
+    """
+    from .models import Post
+
+    # Keyed like the post images ``attach`` looks thumbnails up for.
+    source = ImageFile(name, Post._meta.get_field('image').storage)
+    try:
+        created = False
+        for geometry, options in settings.POST_THUMBNAILS:
+            try:
+                thumbnail = get_thumbnail(source, geometry, **options)
+            except Exception:
+                logger.exception('Cannot create thumbnail of %s', name)
+                continue
+            # sorl logs its own failures and returns a missing or a dummy
+            # file instead.
+            if not isinstance(thumbnail, DummyImageFile):
+                created = created or thumbnail.exists()
+        if created:
+            _bump_posts(name)
+    finally:
+        _pending.discard(name)
+
+
+def _work(func, *args):
+    try:
+        func(*args)
+    finally:
+        connections.close_all()
+
+
+def in_background(func, *args):
+    """Call ``func`` on the thread pool once the transaction commits."""
+    transaction.on_commit(lambda: _get_executor().submit(_work, func, *args))
+
+
+def schedule(name):
+    """Queue thumbnail generation once the current transaction commits."""
+    if not name or name in _pending:
+        return
+    if not settings.TASKS_EAGER:
+        generate.delay(name)
+        return
+    _pending.add(name)
+    in_background(generate, name)
+
+
+def _geometry(geometry):
+    if geometry is None:
+        return settings.POST_THUMBNAILS[0]
+    return geometry, dict(settings.POST_THUMBNAILS)[geometry]
+
+
+def lookup(keys):
+    """Raw key-value store entries of many thumbnails at once.
+
+    Mirrors ``KVStore._get_raw`` of the cached_db store with one
+    ``get_many`` and at most one query, remembering misses the same way.
+    Other stores are asked key by key.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        found = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {
+        key: None if value == EMPTY_VALUE else value
+        for key, value in values.items()
+    }
+
+
+def attach(posts, geometry=None):
+    """Set ``post.thumbnail`` to the finished thumbnail URL or ``None``."""
+    geometry, options = _geometry(geometry)
+    keys = {}
+    for post in posts:
+        post.thumbnail = None
+        if post.image:
+            thumbnail = backend.thumbnail_file(post.image, geometry, **options)
+            keys[post] = add_prefix(thumbnail.key)
+    values = lookup(list(set(keys.values())))
+    for post, key in keys.items():
+        if values.get(key):
+            post.thumbnail = deserialize_image_file(values[key]).url
+        else:
+            schedule(post.image.name)
+    return posts
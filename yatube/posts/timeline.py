@@ -0,0 +1,131 @@
+"""Materialized home timelines for follow_index.
+
+A new post is written into the timeline of every follower of its author
+(fan-out on write), so reading the feed touches only the reader's own
+entries. Authors with more followers than ``TIMELINE_FANOUT_LIMIT`` are
+not fanned out: their posts are merged into the feed at read time. When
+such an author drops back to the limit, ``refill`` writes their latest
+posts into the followers' timelines, which miss the posts written
+meanwhile.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+BATCH_SIZE = 1000
+
+FEED_KEYS = ('feed_date', 'feed_id')
+
+
+def _insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def celebrities(author_ids):
+    """Return the ids of authors that are read on demand."""
+    return set(AuthorStats.objects.filter(
+        user_id__in=author_ids,
+        follower_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('user_id', flat=True))
+
+
+def fan_out(post):
+    """Copy a new post into the timelines of the author's followers."""
+    if celebrities((post.author_id,)):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id, full=False):
+    """Add the latest posts of a newly followed author to a timeline."""
+    if celebrities((author_id,)):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date').values_list('id', 'pub_date')
+    if not full:
+        posts = posts[:settings.TIMELINE_BACKFILL]
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def at_limit(author_id):
+    """Whether an author has exactly as many followers as are fanned out.
+    """
+    return AuthorStats.objects.filter(
+        user_id=author_id, follower_count=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def refill(author_id):
+    """Add the latest posts of an author to every follower's timeline."""
+    if celebrities((author_id,)):
+        return
+    posts = list(Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date').values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL])
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for user_id in followers.iterator()
+        for pk, pub_date in posts
+    )
+
+
+def remove(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Recreate a timeline from scratch with the full author histories."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True)
+    for author_id in authors:
+        backfill(user_id, author_id, full=True)
+
+
+def timeline_posts(user):
+    """Posts of the authors the user follows, newest first.
+
+    The rows are annotated with ``feed_date`` and ``feed_id`` to paginate
+    on. Without followed celebrities they come straight from the reader's
+    entries in index order; otherwise the entries are merged with the
+    celebrities' own posts.
+    """
+    pulled = celebrities(
+        Follow.objects.filter(user=user).values_list('author_id', flat=True)
+    )
+    if not pulled:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_id=F('timeline_entries__post_id'),
+        )
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=pulled)
+    ).annotate(feed_date=F('pub_date'), feed_id=F('id'))
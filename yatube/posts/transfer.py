@@ -0,0 +1,236 @@
+"""Streaming NDJSON export and import of groups, posts, comments and follows.
+
+Each line is one JSON object with a ``model`` key. Rows are read in
+primary key batches and written one by one, so an export runs in
+constant memory. Users and groups are referenced by username and slug.
+
+The import works batch by batch as well: usernames and slugs of a batch
+are resolved with one query each (missing users are created without a
+usable password), and post and comment ids are shifted past the largest
+existing ones instead of being remembered in a mapping. Inserts stamp
+``pub_date`` with the current time, so the exported dates are written
+with an ``UPDATE`` right after them. Bulk inserts send no signals, so
+counters, timelines and the search index are rebuilt at the end.
+"""
+import json
+import time
+from itertools import groupby, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import caching
+from .models import Comment, Follow, Group, Post
+from .utils import update_by_pk
+
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+EXPORTS = (
+    ('group', Group.objects, ('id', 'slug', 'title', 'description')),
+    ('post', Post.objects, (
+        'id', 'author__username', 'group__slug', 'text', 'image', 'pub_date',
+    )),
+    ('comment', Comment.objects, (
+        'id', 'post_id', 'author__username', 'text', 'pub_date',
+    )),
+    ('follow', Follow.objects, ('id', 'user__username', 'author__username')),
+)
+
+
+class Progress:
+    """Write the number of rows and rows per second now and then."""
+
+    def __init__(self, stdout, verb, every=100_000):
+        self.stdout = stdout
+        self.verb = verb
+        self.every = every
+        self.started = time.monotonic()
+        self.rows = 0
+        self.reported = 0
+
+    def add(self, count):
+        self.rows += count
+        if self.rows - self.reported >= self.every:
+            self.report()
+
+    def report(self):
+        self.reported = self.rows
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        self.stdout.write(
+            f'{self.verb} {self.rows} rows ({self.rows / elapsed:.0f} rows/s)'
+        )
+
+
+def _rows(queryset, fields):
+    """Values of all rows, read in primary key batches."""
+    queryset = queryset.order_by('pk').values(*fields)
+    last = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last)[:BATCH_SIZE])
+        if not batch:
+            return
+        yield from batch
+        last = batch[-1]['id']
+
+
+def export(output, stdout):
+    progress = Progress(stdout, 'Exported')
+    for model, queryset, fields in EXPORTS:
+        for row in _rows(queryset, fields):
+            row = {
+                key.replace('__username', '').replace('__slug', ''): value
+                for key, value in row.items()
+            }
+            row['model'] = model
+            output.write(json.dumps(row, default=str) + '\n')
+            progress.add(1)
+    progress.report()
+    return progress.rows
+
+
+def _user_ids(usernames):
+    """Ids of the usernames, creating the users that do not exist."""
+    usernames = set(usernames)
+    ids = dict(User.objects.filter(
+        username__in=usernames
+    ).values_list('username', 'pk'))
+    missing = usernames - ids.keys()
+    if missing:
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in missing],
+            ignore_conflicts=True,
+        )
+        ids.update(User.objects.filter(
+            username__in=missing
+        ).values_list('username', 'pk'))
+    return ids
+
+
+def _group_ids(slugs):
+    return dict(Group.objects.filter(
+        slug__in=set(slugs)
+    ).values_list('slug', 'pk'))
+
+
+class Importer:
+    """Inserts batches of rows; each method returns the scopes to bump."""
+
+    models = tuple(model for model, queryset, fields in EXPORTS)
+
+    def __init__(self):
+        self.post_offset = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        self.comment_offset = Comment.objects.aggregate(
+            last=Max('pk')
+        )['last'] or 0
+
+    def group(self, rows):
+        Group.objects.bulk_create(
+            [
+                Group(
+                    slug=row['slug'],
+                    title=row['title'],
+                    description=row['description'],
+                )
+                for row in rows
+            ],
+            ignore_conflicts=True,
+        )
+        return [caching.group_scope(row['slug']) for row in rows]
+
+    def post(self, rows):
+        users = _user_ids(row['author'] for row in rows)
+        groups = _group_ids(row['group'] for row in rows if row['group'])
+        Post.objects.bulk_create(
+            Post(
+                pk=row['id'] + self.post_offset,
+                author_id=users[row['author']],
+                group_id=groups.get(row['group']),
+                text=row['text'],
+                image=row['image'],
+            )
+            for row in rows
+        )
+        update_by_pk(Post.objects, 'pub_date', (
+            (row['id'] + self.post_offset, parse_datetime(row['pub_date']))
+            for row in rows
+        ))
+        return [caching.author_scope(name) for name in users] + [
+            caching.group_scope(slug) for slug in groups
+        ]
+
+    def comment(self, rows):
+        users = _user_ids(row['author'] for row in rows)
+        Comment.objects.bulk_create(
+            Comment(
+                pk=row['id'] + self.comment_offset,
+                post_id=row['post_id'] + self.post_offset,
+                author_id=users[row['author']],
+                text=row['text'],
+            )
+            for row in rows
+        )
+        update_by_pk(Comment.objects, 'pub_date', (
+            (row['id'] + self.comment_offset, parse_datetime(row['pub_date']))
+            for row in rows
+        ))
+        return []
+
+    def follow(self, rows):
+        users = _user_ids(
+            name for row in rows for name in (row['user'], row['author'])
+        )
+        Follow.objects.bulk_create(
+            [
+                Follow(
+                    user_id=users[row['user']],
+                    author_id=users[row['author']],
+                )
+                for row in rows
+                if row['user'] != row['author']
+            ],
+            ignore_conflicts=True,
+        )
+        return [caching.author_scope(name) for name in users]
+
+
+def _batches(lines):
+    """Lists of at most ``BATCH_SIZE`` rows of the same model."""
+    rows = (json.loads(line) for line in lines if line.strip())
+    for model, group in groupby(rows, key=lambda row: row['model']):
+        while True:
+            batch = list(islice(group, BATCH_SIZE))
+            if not batch:
+                break
+            yield model, batch
+
+
+def load(lines, stdout, rebuild=True):
+    importer = Importer()
+    progress = Progress(stdout, 'Imported')
+    for model, batch in _batches(lines):
+        if model not in importer.models:
+            raise ValueError(f'Unknown model {model!r}')
+        with transaction.atomic():
+            scopes = getattr(importer, model)(batch)
+        caching.bump(*scopes)
+        progress.add(len(batch))
+    progress.report()
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment]
+        ):
+            cursor.execute(sql)
+    if rebuild:
+        for command in ('recount', 'rebuild_timelines', 'reindex_search'):
+            call_command(command, stdout=stdout)
+    caching.bump(caching.INDEX)
+    return progress.rows
@@ -1,8 +1,316 @@
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.paginator import (
+    EmptyPage,
+    InvalidPage,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db.models import Case, Q, Value, When
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
 
-def paginator_yatube(request, post_list):
-    paginator = Paginator(post_list, settings.NUM)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def pk_batches(queryset, size=1000):
+    """Yield lists of primary keys, walking the table by ``pk`` ranges
+    so that no cursor stays open while the caller writes.
+    """
+    last = None
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        batch = list(page[:size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def chunks(items, size=1000):
+    """Split any iterable into lists of at most ``size`` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def update_by_pk(queryset, field, values, size=300):
+    """Give many rows their own value of a field, from ``(pk, value)``
+    pairs, with one ``UPDATE`` per ``size`` rows.
+
+    Bulk inserts overwrite ``auto_now_add`` fields with the current
+    time; the dates to keep are set this way right after them.
+    """
+    output_field = queryset.model._meta.get_field(field)
+    updated = 0
+    for batch in chunks(values, size):
+        updated += queryset.filter(
+            pk__in=[pk for pk, value in batch]
+        ).update(**{field: Case(
+            *(
+                When(pk=pk, then=Value(value, output_field=output_field))
+                for pk, value in batch
+            ),
+            output_field=output_field,
+        )})
+    return updated
+
+
+def key_value(obj, key):
+    """Read a field from a model instance or from a ``.values()`` row."""
+    if isinstance(obj, dict):
+        return obj[key]
+    return getattr(obj, key)
+
+
+class CursorPaginator(Paginator):
+    """Keyset paginator over a queryset ordered by ``(pub_date, id)``.
+
+    Other pairs of keys (a date and a unique tie-breaker, both available
+    on every row) can be passed as ``keys``.
+
+    Pages are addressed either by number or by a cursor that points at
+    the boundary row of a neighbouring page. Cursor pages are fetched
+    with ``WHERE (pub_date, id) < (...)`` instead of ``OFFSET``, so deep
+    pages cost the same as the first one. With ``count=False`` the total
+    ``COUNT(*)`` is never issued and the paginator only knows whether
+    there is a next page. The last page holds the rows left over after
+    the full pages, so the cursor pages line up with the numbered ones.
+
+    The returned objects are plain ``Page`` instances carrying extra
+    ``next_cursor``, ``previous_cursor`` and ``last_cursor`` attributes
+    for the templates, and the ``(number, cursor)`` pairs of the window
+    of numbered pages around them as ``page_links`` (with ``None`` for
+    the page itself) and their numbers as ``page_window``; both are only
+    read when a template uses them.
+    """
+
+    keys = ('pub_date', 'id')
+
+    def __init__(self, object_list, per_page, count=True, window=2,
+                 keys=None, **kwargs):
+        if keys is not None:
+            self.keys = keys
+        ordering = ['-' + key for key in self.keys]
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+        self.count_total = count
+        self.window = window
+        self._reached = 0
+
+    @property
+    def count(self):
+        if not self.count_total:
+            return None
+        if not hasattr(self, '_count'):
+            self._count = self.object_list.count()
+        return self._count
+
+    @property
+    def num_pages(self):
+        """Total pages, or the pages known so far when not counting."""
+        if not self.count_total:
+            return self._reached
+        return max(super().num_pages, self._reached)
+
+    def validate_number(self, number):
+        if self.count_total:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def get_page(self, number, cursor=None):
+        """Return the page for a cursor or a number, falling back to
+        the first page for anything invalid.
+        """
+        if cursor:
+            try:
+                return self.cursor_page(cursor)
+            except InvalidPage:
+                pass
+        if self.count_total:
+            return super().get_page(number)
+        try:
+            page = self.page(number)
+        except InvalidPage:
+            return self.page(1)
+        if not page.object_list and page.number > 1:
+            return self.page(1)
+        return page
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        return self._build_page(rows, number)
+
+    def cursor_page(self, cursor):
+        boundary, number, reverse = self.decode_cursor(cursor)
+        size = self.per_page
+        if boundary is None and reverse and self.count_total:
+            number = self.num_pages
+            size = self.count - (number - 1) * self.per_page
+        rows = self.object_list
+        if boundary is not None:
+            rows = rows.filter(self._seek(boundary, reverse))
+        if reverse:
+            rows = rows.reverse()
+        rows = list(rows[:size + 1])
+        return self._build_page(rows, number,
+                                has_next=boundary is not None,
+                                reverse=reverse, size=size)
+
+    def page_links(self, page):
+        """``(number, cursor)`` pairs of the pages around ``page``.
+
+        The boundaries of the pages past the neighbours are read with a
+        key-only query on each side, of at most ``window * per_page``
+        rows, so the links cost the same on deep pages as on the first.
+        """
+        links = {page.number: None}
+        if page.object_list:
+            links.update(self._links_before(page))
+            if page.has_next():
+                links.update(self._links_after(page))
+        return sorted(links.items())
+
+    def _links_before(self, page):
+        number, first_row = page.number, page.object_list[0]
+        first = max(1, number - self.window)
+        if first == 1 and number > 1:
+            yield 1, self.encode_cursor(None, 1)
+        first = max(first, 2)
+        if first < number:
+            yield number - 1, self.encode_cursor(
+                first_row, number - 1, reverse=True
+            )
+        if first < number - 1:
+            before = self._keys_beyond(
+                first_row, (self.window - 1) * self.per_page, reverse=True
+            )
+            for target in range(number - 2, first - 1, -1):
+                index = (number - 1 - target) * self.per_page - 1
+                if index >= len(before):
+                    return
+                yield target, self.encode_cursor(
+                    before[index], target, reverse=True
+                )
+
+    def _links_after(self, page):
+        number, last_row = page.number, page.object_list[-1]
+        last = number + self.window
+        if self.count_total:
+            last = min(last, self.num_pages)
+        yield number + 1, self.encode_cursor(last_row, number + 1)
+        if number + 1 < last:
+            after = self._keys_beyond(
+                last_row, (self.window - 1) * self.per_page + 1
+            )
+            for target in range(number + 2, last + 1):
+                index = (target - number - 1) * self.per_page - 1
+                if index + 1 >= len(after):
+                    return
+                yield target, self.encode_cursor(after[index], target)
+
+    def encode_cursor(self, obj, number, reverse=False):
+        values = ['', ''] if obj is None else [
+            key_value(obj, key) for key in self.keys
+        ]
+        raw = '|'.join((
+            values[0].isoformat() if values[0] else '',
+            str(values[1]),
+            str(number),
+            'r' if reverse else 'f',
+        ))
+        return urlsafe_base64_encode(raw.encode())
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = urlsafe_base64_decode(cursor).decode()
+            pub_date, pk, number, direction = raw.split('|')
+            number = int(number)
+            boundary = None
+            if pub_date:
+                boundary = (parse_datetime(pub_date), int(pk))
+                if boundary[0] is None:
+                    raise ValueError
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise InvalidPage('Invalid cursor')
+        if number < 1 or direction not in ('f', 'r'):
+            raise InvalidPage('Invalid cursor')
+        return boundary, number, direction == 'r'
+
+    def _seek(self, boundary, reverse):
+        """Row-value comparison spelled so that SQLite can range-scan
+        the ``pub_date`` index and only filter ties by ``id``.
+        """
+        (first, first_value), (second, second_value) = zip(
+            self.keys, boundary
+        )
+        op = 'gt' if reverse else 'lt'
+        return Q(**{f'{first}__{op}e': first_value}) & (
+            Q(**{f'{first}__{op}': first_value})
+            | Q(**{f'{second}__{op}': second_value})
+        )
+
+    def _keys_beyond(self, obj, limit, reverse=False):
+        """The keys of up to ``limit`` rows past ``obj``, nearest first."""
+        rows = self.object_list.filter(self._seek(
+            [key_value(obj, key) for key in self.keys], reverse
+        ))
+        if reverse:
+            rows = rows.reverse()
+        return list(rows.values(*self.keys)[:limit])
+
+    def _build_page(self, rows, number, has_next=None, reverse=False,
+                    size=None):
+        size = self.per_page if size is None else size
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+            number = max(number, 2) if has_more else 1
+        else:
+            has_next = has_more
+        self._reached = number + 1 if has_next else number
+        page = self._get_page(rows, number, self)
+        page.next_cursor = page.previous_cursor = page.last_cursor = None
+        if page.has_next() and rows:
+            page.next_cursor = self.encode_cursor(rows[-1], number + 1)
+            if self.count_total:
+                page.last_cursor = self.encode_cursor(
+                    None, self.num_pages, reverse=True
+                )
+        if page.has_previous() and rows:
+            page.previous_cursor = self.encode_cursor(
+                rows[0], number - 1, reverse=True
+            )
+        page.page_links = SimpleLazyObject(lambda: self.page_links(page))
+        page.page_window = SimpleLazyObject(lambda: [
+            number for number, cursor in page.page_links
+        ])
+        return page
+
+
+def paginator_yatube(request, post_list, count=None, keys=None):
+    if count is None:
+        count = settings.PAGINATOR_COUNT
+    paginator = CursorPaginator(
+        post_list,
+        settings.NUM,
+        count=count,
+        window=settings.PAGINATOR_WINDOW,
+        keys=keys,
+    )
+    return paginator.get_page(
+        request.GET.get('page'),
+        cursor=request.GET.get('cursor'),
+    )
@@ -1,28 +1,82 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
 
+from . import caching, thumbnails
+from .counters import stats_for
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
-from .utils import paginator_yatube
+from .timeline import FEED_KEYS, timeline_posts
+from .utils import CursorPaginator, paginator_yatube
 
 
 User = get_user_model()
 
 
+def post_page(request, post_list, **kwargs):
+    """Paginate posts and resolve the thumbnails of the page together."""
+    page_obj = paginator_yatube(request, post_list, **kwargs)
+    thumbnails.attach(page_obj.object_list)
+    return page_obj
+
+
+def comment_page(post, cursor=None):
+    """A page of comments, newest first; older pages by keyset cursor.
+
+    One sliced query with the authors joined, instead of prefetching
+    every comment of the post.
+    """
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        count=False,
+    )
+    return paginator.get_page(1, cursor=cursor)
+
+
+def index_scopes(request):
+    return (caching.INDEX,)
+
+
+def group_scopes(request, slug):
+    return (caching.group_scope(slug),)
+
+
+def profile_scopes(request, username):
+    return (caching.author_scope(username),)
+
+
+def post_scopes(request, post_id):
+    author = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True
+    ).first()
+    return (caching.post_scope(post_id), caching.author_scope(author))
+
+
+@caching.conditional_page(index_scopes)
+@caching.cache_anonymous_page(index_scopes)
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
-    page_obj = paginator_yatube(request, post_list)
+    version, = caching.feed_versions(caching.INDEX)
     context = {
-        'page_obj': page_obj,
+        # Only evaluated when the versioned fragment is not cached.
+        'page_obj': SimpleLazyObject(
+            lambda: post_page(request, post_list)
+        ),
+        'feed_version': version,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/index.html', context)
 
 
+@caching.conditional_page(group_scopes)
+@caching.cache_anonymous_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author')
-    page_obj = paginator_yatube(request, post_list)
+    page_obj = post_page(request, post_list)
 
     context = {
         'group': group,
@@ -31,10 +85,15 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@caching.conditional_page(profile_scopes)
+@caching.cache_anonymous_page(profile_scopes)
 def profile(request, username):
-    profile = get_object_or_404(User, username=username)
+    profile = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
     post_list = profile.posts.select_related('group')
-    page_obj = paginator_yatube(request, post_list)
+    page_obj = post_page(request, post_list)
     user = request.user
     following = (
         request.user.is_authenticated
@@ -42,25 +101,44 @@ def profile(request, username):
     )
     context = {
         'profile': profile,
+        'stats': stats_for(profile),
         'page_obj': page_obj,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@caching.conditional_page(post_scopes, csrf=True)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.prefetch_related('comments__author'),
+        Post.objects.select_related('author__stats', 'group'),
         pk=post_id
     )
+    thumbnails.attach((post,))
+    comments = comment_page(post, request.GET.get('comments'))
     context = {
         'post': post,
+        'author_stats': stats_for(post.author),
         'form': CommentForm(),
-        'comment_list': post.comments.all()
+        'comment_page': comments,
+        'comment_list': comments.object_list,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@caching.conditional_page(post_scopes, per_user=False)
+def post_comments(request, post_id):
+    """The HTML of the comments after ``cursor``, for "load more"."""
+    post = get_object_or_404(Post, pk=post_id)
+    comments = comment_page(post, request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'comment_page': comments,
+        'comment_list': comments.object_list,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -109,10 +187,10 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    following = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author')
-    page_obj = paginator_yatube(request, following)
+    following = timeline_posts(request.user).select_related(
+        'author', 'group'
+    )
+    page_obj = post_page(request, following, count=False, keys=FEED_KEYS)
     context = {
         'page_obj': page_obj,
     }
@@ -130,5 +208,7 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(author__username=username).delete()
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
     return redirect('posts:profile', username=username)
@@ -0,0 +1,168 @@
+"""Full-text search backends.
+
+A backend keeps an index of post and comment texts and returns the ids
+of the posts matching a query, best first. ``Fts5Backend`` keeps the
+index in SQLite FTS5 tables created by the migrations of this app;
+``DatabaseBackend`` has no index and uses the ``icontains`` scan of
+``BaseBackend``.
+The backend is chosen with ``settings.SEARCH_BACKEND``.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from posts.models import Post
+
+
+TERM = re.compile(r'\w+')
+
+MAX_TERMS = 10
+
+POST_TABLE = 'search_post_fts'
+
+COMMENT_TABLE = 'search_comment_fts'
+
+
+def terms(query):
+    """Split a user query into lowercase words, ignoring punctuation."""
+    return TERM.findall(query.lower())[:MAX_TERMS]
+
+
+class BaseBackend:
+    """Keeps no index: the index methods do nothing and ``search`` scans
+    the tables. Backends with an index override both.
+    """
+
+    def index_posts(self, rows):
+        """Add or replace posts given as ``(id, text)`` pairs."""
+
+    def remove_posts(self, ids):
+        pass
+
+    def index_comments(self, rows):
+        """Add or replace comments given as ``(id, post_id, text)``."""
+
+    def remove_comments(self, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def optimize(self):
+        pass
+
+    def search(self, query, limit):
+        """Return up to ``limit`` ids of matching posts, best first.
+
+        Without an index, the newest posts whose text or comments
+        contain every word are returned.
+        """
+        words = terms(query)
+        if not words:
+            return []
+        condition = Q()
+        for word in words:
+            condition &= (
+                Q(text__icontains=word) | Q(comments__text__icontains=word)
+            )
+        return list(
+            Post.objects.filter(condition)
+            .order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+            .distinct()[:limit]
+        )
+
+
+class DatabaseBackend(BaseBackend):
+    """Scans the tables; for databases without a full-text index."""
+
+
+class Fts5Backend(BaseBackend):
+    """SQLite FTS5 index ranked with bm25.
+
+    Every word of the query must match. Post and comment matches are
+    each cut to the ``limit`` best before they are merged, so a query
+    costs the same however many rows match it.
+    """
+
+    def _execute(self, sql, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def index_posts(self, rows):
+        rows = list(rows)
+        self.remove_posts(pk for pk, text in rows)
+        self._execute(
+            f'INSERT INTO {POST_TABLE} (rowid, text) VALUES (%s, %s)', rows
+        )
+
+    def remove_posts(self, ids):
+        self._execute(
+            f'DELETE FROM {POST_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in ids],
+        )
+
+    def index_comments(self, rows):
+        rows = list(rows)
+        self.remove_comments(pk for pk, post_id, text in rows)
+        self._execute(
+            f'INSERT INTO {COMMENT_TABLE} (rowid, post_id, text) '
+            'VALUES (%s, %s, %s)',
+            rows,
+        )
+
+    def remove_comments(self, ids):
+        self._execute(
+            f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in ids],
+        )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            for table in (POST_TABLE, COMMENT_TABLE):
+                cursor.execute(f'DELETE FROM {table}')
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            for table in (POST_TABLE, COMMENT_TABLE):
+                cursor.execute(
+                    f"INSERT INTO {table} ({table}) VALUES ('optimize')"
+                )
+
+    def search(self, query, limit):
+        words = terms(query)
+        if not words:
+            return []
+        match = ' '.join(f'"{word}"' for word in words)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT post_id FROM ('
+                ' SELECT * FROM ('
+                f'  SELECT rowid AS post_id, rank AS score FROM {POST_TABLE}'
+                f'  WHERE {POST_TABLE} MATCH %s ORDER BY rank LIMIT %s)'
+                ' UNION ALL'
+                ' SELECT * FROM ('
+                f'  SELECT post_id, rank * %s AS score FROM {COMMENT_TABLE}'
+                f'  WHERE {COMMENT_TABLE} MATCH %s ORDER BY rank LIMIT %s)'
+                ') GROUP BY post_id ORDER BY min(score), post_id DESC'
+                ' LIMIT %s',
+                (
+                    match, limit,
+                    settings.SEARCH_COMMENT_WEIGHT, match, limit,
+                    limit,
+                ),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _load(settings.SEARCH_BACKEND)
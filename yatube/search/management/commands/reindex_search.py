@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Comment, Post
+from posts.utils import pk_batches
+from search.backends import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts and comments.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.clear()
+        posts = comments = 0
+        for batch in pk_batches(Post.objects):
+            with transaction.atomic():
+                backend.index_posts(Post.objects.filter(
+                    pk__in=batch
+                ).values_list('id', 'text'))
+            posts += len(batch)
+        for batch in pk_batches(Comment.objects):
+            with transaction.atomic():
+                backend.index_comments(Comment.objects.filter(
+                    pk__in=batch
+                ).values_list('id', 'post_id', 'text'))
+            comments += len(batch)
+        backend.optimize()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {posts} posts and {comments} comments'
+        ))
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2'"
+
+
+def create_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE search_post_fts USING fts5(text, {TOKENIZE})'
+    )
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE search_comment_fts USING fts5('
+        f'text, post_id UNINDEXED, {TOKENIZE})'
+    )
+    schema_editor.execute(
+        'INSERT INTO search_post_fts (rowid, text) '
+        'SELECT id, text FROM posts_post'
+    )
+    schema_editor.execute(
+        'INSERT INTO search_comment_fts (rowid, post_id, text) '
+        'SELECT id, post_id, text FROM posts_comment'
+    )
+
+
+def drop_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE search_post_fts')
+    schema_editor.execute('DROP TABLE search_comment_fts')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('posts', '0012_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_tables, drop_tables),
+    ]
@@ -0,0 +1,110 @@
+import os
+import runpy
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from search.backends import DatabaseBackend, get_backend, terms
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.river = Post.objects.create(
+            author=cls.user, text='A long walk along the river bank'
+        )
+        cls.forest = Post.objects.create(
+            author=cls.user, text='Mushrooms in the forest'
+        )
+        Comment.objects.create(
+            author=cls.user, post=cls.forest, text='We saw a river too'
+        )
+        cls.cyrillic = Post.objects.create(
+            author=cls.user, text='Прогулка по Берегу реки'
+        )
+
+    def search(self, query):
+        return get_backend().search(query, 100)
+
+    def test_terms(self):
+        self.assertEqual(terms('River, "bank"!*'), ['river', 'bank'])
+        self.assertEqual(self.search(' "* '), [])
+
+    def test_posts_rank_above_comment_matches(self):
+        self.assertEqual(self.search('river'), [self.river.pk, self.forest.pk])
+        self.assertEqual(self.search('river bank'), [self.river.pk])
+        self.assertEqual(self.search('берегу'), [self.cyrillic.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        river = Post.objects.get(pk=self.river.pk)
+        river.text = 'A lake'
+        river.save()
+        self.assertEqual(self.search('river'), [self.forest.pk])
+        Comment.objects.filter(post=self.forest).delete()
+        self.assertEqual(self.search('river'), [])
+        Post.objects.filter(pk=self.forest.pk).delete()
+        self.assertEqual(self.search('mushrooms'), [])
+
+    def test_reindex_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM search_post_fts')
+        self.assertEqual(self.search('forest'), [])
+        call_command('reindex_search', stdout=StringIO())
+        self.assertEqual(self.search('forest'), [self.forest.pk])
+
+    @override_settings(SEARCH_BACKEND='search.backends.DatabaseBackend')
+    def test_database_backend(self):
+        self.assertIsInstance(get_backend(), DatabaseBackend)
+        self.assertEqual(
+            set(self.search('river')), {self.river.pk, self.forest.pk}
+        )
+
+    @override_settings(NUM=1)
+    def test_search_page(self):
+        url = reverse('search:search')
+        response = Client().get(url, {'q': 'river'})
+        self.assertEqual(response.context['query'], 'river')
+        self.assertEqual(
+            list(response.context['page_obj']), [self.river]
+        )
+        self.assertContains(response, '?q=river&page=2')
+        response = Client().get(url, {'q': 'river', 'page': 2})
+        self.assertEqual(
+            list(response.context['page_obj']), [self.forest]
+        )
+        self.assertIsNone(Client().get(url).context['page_obj'])
+
+
+class BackendSettingsTests(SimpleTestCase):
+    def load_settings(self, **environ):
+        path = os.path.join(settings.BASE_DIR, 'yatube', 'settings.py')
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(path)
+
+    def test_fts5_off_sqlite_is_not_used(self):
+        """The FTS5 tables are not created on PostgreSQL."""
+        for environ in ({}, {'DB_POOL_SIZE': '4'}):
+            loaded = self.load_settings(POSTGRES_DB='yatube', **environ)
+            engine = loaded['DATABASES']['default']['ENGINE']
+            self.assertTrue(engine.endswith('postgresql'))
+            self.assertEqual(
+                loaded['SEARCH_BACKEND'], 'search.backends.DatabaseBackend'
+            )
+
+    def test_fts5_on_sqlite(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('POSTGRES_DB', None)
+            loaded = self.load_settings()
+        self.assertEqual(
+            loaded['SEARCH_BACKEND'], 'search.backends.Fts5Backend'
+        )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.shortcuts import render
+
+from posts import thumbnails
+from posts.models import Post
+
+from .backends import get_backend
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        ids = get_backend().search(query, settings.SEARCH_MAX_RESULTS)
+        page_obj = Paginator(ids, settings.NUM).get_page(
+            request.GET.get('page')
+        )
+        posts = Post.objects.select_related(
+            'author', 'group'
+        ).in_bulk(page_obj.object_list)
+        page_obj.object_list = [
+            posts[pk] for pk in page_obj.object_list if pk in posts
+        ]
+        thumbnails.attach(page_obj.object_list)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'search/search.html', context)
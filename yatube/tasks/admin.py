@@ -0,0 +1,30 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Job.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_by='',
+        )
+    retry.short_description = 'Run the selected jobs again'
+
+
+admin.site.register(Job, JobAdmin)
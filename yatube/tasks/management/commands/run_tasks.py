@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from tasks import queue
+
+
+class Command(BaseCommand):
+    help = 'Run queued jobs until stopped, or until none is due with --once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch',
+            type=int,
+            help='Jobs to claim at a time; defaults to TASKS_BATCH_SIZE.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when no job is due.',
+        )
+        parser.add_argument('--once', action='store_true')
+        parser.add_argument('--worker', help='Name shown on locked jobs.')
+
+    def handle(self, *args, **options):
+        done = queue.work(
+            worker=options['worker'],
+            batch_size=options['batch'],
+            once=options['once'],
+            sleep=options['sleep'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(f'{done} jobs done')
@@ -0,0 +1,42 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField('Task name', max_length=200)
+    args = models.TextField('Arguments as JSON', default='[]')
+    status = models.CharField(
+        'Status',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField('Attempts', default=0)
+    max_attempts = models.PositiveIntegerField('Maximum attempts')
+    run_at = models.DateTimeField('Run at', default=timezone.now)
+    locked_by = models.CharField('Worker', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Locked at', null=True, blank=True)
+    last_error = models.TextField('Last error', blank=True)
+    created = models.DateTimeField('Created', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'), name='job_status_run_at_idx'
+            ),
+            models.Index(fields=('locked_by',), name='job_locked_by_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.name}{self.args}'
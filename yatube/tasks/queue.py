@@ -0,0 +1,212 @@
+"""A job queue in the project database, without an external broker.
+
+``@task`` registers a function; ``function.delay(*args)`` stores a
+``Job`` in the current transaction, so a job exists only once the writes
+it follows are committed, and ``run_tasks`` workers pick it up. Calls of
+a ``unique_for`` task are stored once the transaction commits instead,
+so that a rolled back call does not keep the next ones out. With
+``TASKS_EAGER`` the function runs right away instead, as it does during
+development and in tests. Arguments go through JSON either way.
+
+Workers claim due jobs in batches with one conditional ``UPDATE``,
+which is atomic on SQLite and PostgreSQL alike. A failing job is retried
+after ``TASKS_RETRY_DELAY * 2 ** (attempts - 1)`` seconds until it ran
+``max_attempts`` times; jobs of a worker that died are released after
+``TASKS_LOCK_TIMEOUT`` seconds. A batch task gets the arguments of all
+its claimed jobs in one call.
+"""
+import hashlib
+import json
+import logging
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_KEY = 'task-unique:{}'
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, name, batch, max_attempts, unique_for):
+        self.func = func
+        self.name = name
+        self.batch = batch
+        self.max_attempts = max_attempts
+        self.unique_for = unique_for
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def _is_duplicate(self, args):
+        """Whether the same call was queued in the last ``unique_for``
+        seconds.
+        """
+        if not self.unique_for:
+            return False
+        digest = hashlib.md5(f'{self.name}:{args}'.encode()).hexdigest()
+        return not cache.add(UNIQUE_KEY.format(digest), 1, self.unique_for)
+
+    def delay(self, *args):
+        """Queue a call, or make it now with ``TASKS_EAGER``."""
+        args = json.dumps(args)
+        if self.unique_for:
+            transaction.on_commit(lambda: self._enqueue(args))
+        else:
+            self._enqueue(args)
+
+    def _enqueue(self, args):
+        if self._is_duplicate(args):
+            return
+        if settings.TASKS_EAGER:
+            self.run([json.loads(args)])
+            return
+        Job.objects.create(
+            name=self.name,
+            args=args,
+            max_attempts=self.max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        )
+
+    def run(self, calls):
+        if self.batch:
+            self.func(calls)
+            return
+        for args in calls:
+            self.func(*args)
+
+
+def task(func=None, *, batch=False, max_attempts=None, unique_for=None):
+    """Register a function as a task.
+
+    A ``batch`` task takes one argument, the list of the argument lists
+    of the queued calls. ``unique_for`` drops repeated calls with the
+    same arguments for that many seconds.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        _registry[name] = Task(func, name, batch, max_attempts, unique_for)
+        return _registry[name]
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def backoff(attempts):
+    return settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def release_stale():
+    """Put back the jobs of workers that stopped in the middle of them."""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASKS_LOCK_TIMEOUT
+        ),
+    ).update(status=Job.QUEUED, locked_by='')
+
+
+def claim(worker, limit):
+    """Lock up to ``limit`` due jobs for the worker and return them."""
+    now = timezone.now()
+    ids = list(Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'pk').values_list('pk', flat=True)[:limit])
+    if not ids:
+        return []
+    token = f'{worker}:{uuid.uuid4().hex}'
+    # Another worker may have claimed some of them since the SELECT.
+    Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+        status=Job.RUNNING,
+        locked_by=token,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(Job.objects.filter(locked_by=token).order_by('run_at', 'pk'))
+
+
+def _failed(jobs, error):
+    now = timezone.now()
+    for job in jobs:
+        job.last_error = error
+        job.locked_by = ''
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.QUEUED
+            job.run_at = now + timedelta(seconds=backoff(job.attempts))
+        job.save(update_fields=(
+            'last_error', 'locked_by', 'status', 'run_at'
+        ))
+
+
+def _run(task, jobs):
+    try:
+        if task is None:
+            raise LookupError(f'Unknown task {jobs[0].name}')
+        with transaction.atomic():
+            task.run([json.loads(job.args) for job in jobs])
+    except Exception:
+        logger.exception('Task %s failed', jobs[0].name)
+        _failed(jobs, traceback.format_exc())
+        return 0
+    Job.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+    return len(jobs)
+
+
+def run_jobs(jobs):
+    """Run claimed jobs; return how many succeeded."""
+    done = 0
+    jobs = sorted(jobs, key=lambda job: job.name)
+    for name, group in groupby(jobs, key=lambda job: job.name):
+        task = get_task(name)
+        group = list(group)
+        if task is not None and task.batch:
+            done += _run(task, group)
+        else:
+            done += sum(_run(task, [job]) for job in group)
+    return done
+
+
+def work(worker=None, batch_size=None, once=False, sleep=1.0,
+         stdout=None):
+    """Run jobs until stopped, or until none is due with ``once``."""
+    worker = worker or uuid.uuid4().hex[:8]
+    batch_size = batch_size or settings.TASKS_BATCH_SIZE
+    done = 0
+    while True:
+        release_stale()
+        jobs = claim(worker, batch_size)
+        if jobs:
+            succeeded = run_jobs(jobs)
+            done += succeeded
+            if stdout is not None:
+                stdout.write(
+                    f'Ran {len(jobs)} jobs, {len(jobs) - succeeded} failed'
+                )
+        elif once:
+            return done
+        else:
+            time.sleep(sleep)
+        if not connection.in_atomic_block:
+            close_old_connections()
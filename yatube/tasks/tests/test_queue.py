@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import transaction
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import AuthorStats, Follow, Post
+from tasks import queue
+from tasks.models import Job
+
+User = get_user_model()
+
+calls = []
+
+
+@queue.task
+def record(value):
+    calls.append(value)
+
+
+@queue.task(max_attempts=2)
+def broken():
+    raise ValueError('broken')
+
+
+@queue.task(batch=True)
+def record_batch(batch):
+    calls.append(batch)
+
+
+@queue.task(unique_for=60)
+def record_once(value):
+    calls.append(value)
+
+
+@override_settings(TASKS_EAGER=False)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        cache.clear()
+
+    def test_delay_queues_a_job_for_the_worker(self):
+        record.delay('value')
+        self.assertEqual(calls, [])
+        self.assertEqual(Job.objects.get().name, record.name)
+        self.assertEqual(queue.work(once=True), 1)
+        self.assertEqual(calls, ['value'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        broken.delay()
+        started = timezone.now()
+        self.assertEqual(queue.work(once=True), 0)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=30))
+        self.assertIn('ValueError: broken', job.last_error)
+        # Not due yet.
+        self.assertEqual(queue.claim('worker', 10), [])
+        Job.objects.update(run_at=started)
+        queue.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_batch_tasks_run_once_per_batch(self):
+        for value in range(3):
+            record_batch.delay(value)
+        record.delay('single')
+        self.assertEqual(queue.work(batch_size=10, once=True), 4)
+        self.assertCountEqual(calls, [[[0], [1], [2]], 'single'])
+
+    def test_jobs_are_claimed_once(self):
+        record.delay('value')
+        self.assertEqual(len(queue.claim('first', 10)), 1)
+        self.assertEqual(queue.claim('second', 10), [])
+
+    def test_stale_jobs_are_released(self):
+        record.delay('value')
+        queue.claim('crashed', 10)
+        self.assertEqual(queue.release_stale(), 0)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.release_stale(), 1)
+        self.assertEqual(queue.work(once=True), 1)
+        self.assertEqual(calls, ['value'])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_at_once(self):
+        record.delay('value')
+        self.assertEqual(calls, ['value'])
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(TASKS_EAGER=False)
+class QueuedSideEffectsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='secret'
+        )
+
+    def test_password_reset_email_is_sent_by_the_worker(self):
+        response = Client().post(
+            reverse('users:password_reset'), {'email': 'reader@example.com'}
+        )
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        queue.work(once=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+
+    def test_fan_out_runs_in_the_worker(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Queued')
+        self.assertFalse(self.reader.timeline.filter(post=post).exists())
+        queue.work(once=True)
+        self.assertTrue(self.reader.timeline.filter(post=post).exists())
+
+    def test_missing_author_stats_are_recounted_by_the_worker(self):
+        AuthorStats.objects.filter(user=self.author).delete()
+        Post.objects.create(author=self.author, text='Counted')
+        self.assertFalse(AuthorStats.objects.filter(user=self.author))
+        queue.work(once=True)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.post_count, 1)
+
+
+@override_settings(TASKS_EAGER=False)
+class UniqueTaskTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unique_calls_are_queued_once(self):
+        record_once.delay('value')
+        record_once.delay('value')
+        record_once.delay('other')
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_rolled_back_calls_do_not_hold_the_key(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                record_once.delay('value')
+                raise ValueError
+        self.assertFalse(Job.objects.exists())
+        record_once.delay('value')
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_missing_thumbnails_are_queued_once(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(
+            author=author, text='Image', image='posts/queued.gif'
+        )
+        url = reverse('posts:post_detail', args=(post.pk,))
+        Client().get(url)
+        Client().get(url)
+        self.assertEqual(
+            list(Job.objects.filter(
+                name='posts.thumbnails.generate'
+            ).values_list('args', flat=True)),
+            ['["posts/queued.gif"]'],
+        )
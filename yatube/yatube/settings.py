@@ -1,4 +1,5 @@
 import os
+import sys
 
 from dotenv import load_dotenv
 
@@ -22,6 +23,9 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'search.apps.SearchConfig',
+    'api.apps.ApiConfig',
+    'tasks.apps.TasksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -33,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ReadReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,7 +54,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.InstrumentedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,6 +71,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Threads running the requests served through yatube.asgi.
+ASGI_THREADS: int = int(os.getenv('ASGI_THREADS', 10))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -72,6 +81,54 @@ DATABASES = {
     }
 }
 
+if os.getenv('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB'),
+        'USER': os.getenv('POSTGRES_USER', ''),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+    }
+
+if (os.getenv('DB_READ_REPLICA')
+        and DATABASES['default']['ENGINE'].endswith('sqlite3')):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'file:{}?mode=ro'.format(DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Seconds to keep a connection open between requests; 0 closes it (or
+# returns it to the pool) at the end of every request.
+CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 0))
+
+if os.getenv('DB_POOL_SIZE'):
+    for database in DATABASES.values():
+        database['ENGINE'] = database['ENGINE'].replace(
+            'django.db.backends.', 'core.db_backends.'
+        )
+        database['POOL'] = {
+            'MAX_SIZE': int(os.getenv('DB_POOL_SIZE')),
+            'MAX_AGE': int(os.getenv('DB_POOL_MAX_AGE', 300)),
+            'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'HEALTH_CHECKS': True,
+        }
+
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = CONN_MAX_AGE
+
+DATABASE_ROUTERS = ['core.db.ReadReplicaRouter']
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -109,6 +166,101 @@ NUM: int = 10
 
 NUM2: int = 13
 
+PAGINATOR_COUNT: bool = True
+
+PAGINATOR_WINDOW: int = 2
+
+TIMELINE_FANOUT_LIMIT: int = 1000
+
+TIMELINE_BACKFILL: int = 200
+
+FEED_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+PAGE_CACHE_TIMEOUT: int = 60 * 10
+
+PAGE_CACHE_GRACE: int = 60
+
+PAGE_CACHE_LOCK: int = 10
+
+PAGE_CACHE_WAIT_STEPS: int = 10
+
+FEED_ITEMS: int = 20
+
+# Seconds to keep a rendered post card; new versions get new keys.
+POST_CARD_TIMEOUT: int = 60 * 60 * 24
+
+# Comments rendered with a post; older ones are loaded on demand.
+COMMENTS_PER_PAGE: int = 20
+
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+THUMBNAIL_WORKERS: int = 2
+
+# Uploads over these limits are rejected by the post form.
+POST_IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+
+POST_IMAGE_MAX_SIDE: int = 6000
+
+# Widths of the re-encoded variants of post images, served with srcset.
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+
+POST_IMAGE_FORMAT = 'WEBP'
+
+POST_IMAGE_QUALITY: int = 80
+
+# Processes encoding images for one worker.
+POST_IMAGE_PROCESSES: int = 2
+
+# Seconds a stored image must have been unused before collect_blobs
+# deletes it.
+BLOB_GC_GRACE: int = 60 * 60 * 24
+
+# Seconds since the last change before collect_media deletes a file.
+MEDIA_GC_GRACE: int = 60 * 60
+
+# Run tasks at once instead of queueing them for `manage.py run_tasks`.
+TASKS_EAGER: bool = os.getenv('TASKS_EAGER', '1') != '0'
+
+TASKS_MAX_ATTEMPTS: int = 5
+
+# Seconds before the first retry; every further retry waits twice as long.
+TASKS_RETRY_DELAY: int = 30
+
+TASKS_LOCK_TIMEOUT: int = 600
+
+TASKS_BATCH_SIZE: int = 100
+
+# Seconds during which an image gets no second thumbnail job.
+THUMBNAIL_JOB_UNIQUE_FOR: int = 300
+
+# The FTS5 tables of the search app only exist on SQLite.
+if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    SEARCH_BACKEND = 'search.backends.Fts5Backend'
+else:
+    SEARCH_BACKEND = 'search.backends.DatabaseBackend'
+
+SEARCH_MAX_RESULTS: int = 1000
+
+SEARCH_COMMENT_WEIGHT: float = 0.5
+
+API_MAX_LIMIT: int = 100
+
+METRICS_WINDOW: int = 1000
+
+QUERY_BUDGET_RAISE: bool = False
+
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 7,
+    'posts:post_comments': 4,
+    'posts:follow_index': 7,
+    'search:search': 6,
+}
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -123,9 +275,44 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'yatube',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            # Locks of the page cache and of unique tasks.
+            'L2_ONLY': ('page-lock:', 'task-unique:'),
+        },
+    },
+    'shared': {
+        # The tiered cache needs atomic incr and add from its L2. Writes
+        # do not cull; run the cull_cache command periodically.
+        'BACKEND': 'core.backends.LockingFileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+if os.getenv('REDIS_URL'):
+    # Needs django-redis; the file cache is used without it. Use a
+    # volatile-* maxmemory-policy so that keys without a timeout, the
+    # generation counters and feed versions, are never evicted.
+    CACHES['shared'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Test runs keep their cache in memory rather than in BASE_DIR/cache.
+if sys.argv[1:2] == ['test'] or 'pytest' in sys.modules:
+    CACHES['shared'] = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube-tests',
     }
-}
 
 INTERNAL_IPS = [
     '127.0.0.1',